@@ -1,11 +1,2 @@
-import graphene
-
-
-class Query(graphene.ObjectType):
-    hello = graphene.String(default_value="Hello, GraphQL!")
-
-
-schema = graphene.Schema(query=Query)
-
-
-
+# Re-export the project schema instead of building a second one.
+from alx_backend_graphql_crm.schema import Query, schema  # noqa: F401
@@ -3,4 +3,37 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "alx_backend_graphql_crm.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: the schema pulls in the models.
+from crm.pubsub import close_pubsub  # noqa: E402
+from .graphql_ws import GraphQLWebSocket  # noqa: E402
+from .schema import schema  # noqa: E402
+
+websocket_application = GraphQLWebSocket(schema, path="/graphql")
+
+
+async def lifespan(scope, receive, send):
+    # Django's handler rejects lifespan scopes; answer them here so the
+    # server's shutdown reaches the pubsub listeners.
+    while True:
+        event = await receive()
+        if event["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif event["type"] == "lifespan.shutdown":
+            try:
+                await close_pubsub()
+            except Exception as e:
+                await send({"type": "lifespan.shutdown.failed", "message": str(e)})
+            else:
+                await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,170 @@
+"""GraphQL over WebSocket (``graphql-transport-ws`` protocol) as a plain ASGI app.
+
+Subscriptions are streamed from ``schema.subscribe``; queries and mutations
+sent over the socket are executed once in a worker thread, since the
+resolvers use the synchronous ORM. Identical concurrent queries share one
+execution (see ``crm.singleflight``).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from graphql import OperationType, get_operation_ast, parse
+from graphql.error import GraphQLError
+
+from crm import singleflight
+
+
+logger = logging.getLogger(__name__)
+
+SUBPROTOCOL = "graphql-transport-ws"
+
+
+def _scope_key(scope) -> str:
+    # No auth middleware on this path: credentials are whatever the client sent.
+    headers = dict(scope.get("headers") or [])
+    credentials = headers.get(b"authorization", b"") + b"|" + headers.get(b"cookie", b"")
+    return "ws:" + hashlib.sha256(credentials).hexdigest()
+
+
+def _format_result(result) -> dict:
+    payload = {"data": result.data}
+    if result.errors:
+        payload["errors"] = [error.formatted for error in result.errors]
+    return payload
+
+
+class GraphQLWebSocket:
+    def __init__(self, schema, path: str = "/graphql", init_timeout: float = 10.0):
+        self.schema = schema
+        self.path = path.rstrip("/")
+        self.init_timeout = init_timeout
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event["type"] != "websocket.connect":
+            return
+        if scope["path"].rstrip("/") != self.path or SUBPROTOCOL not in scope.get("subprotocols", []):
+            await send({"type": "websocket.close", "code": 4406})
+            return
+        await send({"type": "websocket.accept", "subprotocol": SUBPROTOCOL})
+        await _Connection(self.schema, scope, receive, send, self.init_timeout).run()
+
+
+class _Connection:
+    def __init__(self, schema, scope, receive, send, init_timeout: float):
+        self.schema = schema
+        self.scope = scope
+        self.receive = receive
+        self._send = send
+        self.init_timeout = init_timeout
+        self.acknowledged = False
+        self.operations: dict[str, asyncio.Task] = {}
+        self.send_lock = asyncio.Lock()
+
+    async def send(self, message: dict) -> None:
+        async with self.send_lock:
+            await self._send({"type": "websocket.send", "text": json.dumps(message)})
+
+    async def close(self, code: int) -> None:
+        async with self.send_lock:
+            await self._send({"type": "websocket.close", "code": code})
+
+    async def run(self) -> None:
+        try:
+            while True:
+                timeout = None if self.acknowledged else self.init_timeout
+                try:
+                    event = await asyncio.wait_for(self.receive(), timeout)
+                except asyncio.TimeoutError:
+                    await self.close(4408)
+                    return
+                if event["type"] == "websocket.disconnect":
+                    return
+                try:
+                    message = json.loads(event.get("text") or event.get("bytes") or "")
+                    message_type = message["type"]
+                except (ValueError, KeyError, TypeError):
+                    await self.close(4400)
+                    return
+                if not await self.handle(message_type, message):
+                    return
+        finally:
+            tasks = list(self.operations.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def handle(self, message_type: str, message: dict) -> bool:
+        if message_type == "connection_init":
+            if self.acknowledged:
+                await self.close(4429)
+                return False
+            self.acknowledged = True
+            await self.send({"type": "connection_ack"})
+        elif message_type == "ping":
+            await self.send({"type": "pong"})
+        elif message_type == "pong":
+            pass
+        elif message_type == "subscribe":
+            if not self.acknowledged:
+                await self.close(4401)
+                return False
+            op_id = message.get("id")
+            if op_id in self.operations:
+                await self.close(4409)
+                return False
+            task = asyncio.ensure_future(self.execute(op_id, message.get("payload") or {}))
+            self.operations[op_id] = task
+            task.add_done_callback(lambda _: self.operations.pop(op_id, None))
+        elif message_type == "complete":
+            task = self.operations.pop(message.get("id"), None)
+            if task:
+                task.cancel()
+        else:
+            await self.close(4400)
+            return False
+        return True
+
+    async def execute(self, op_id: str, payload: dict) -> None:
+        query = payload.get("query") or ""
+        kwargs = {
+            "variable_values": payload.get("variables"),
+            "operation_name": payload.get("operationName"),
+            "context_value": {"scope": self.scope},
+        }
+        try:
+            operation = get_operation_ast(parse(query), kwargs["operation_name"])
+        except GraphQLError as e:
+            await self.send({"id": op_id, "type": "error", "payload": [e.formatted]})
+            return
+
+        try:
+            if operation is not None and operation.operation == OperationType.SUBSCRIPTION:
+                result = await self.schema.subscribe(query, **kwargs)
+                if hasattr(result, "__aiter__"):
+                    async for item in result:
+                        await self.send({"id": op_id, "type": "next", "payload": _format_result(item)})
+                elif result.errors:
+                    await self.send({"id": op_id, "type": "error", "payload": [e.formatted for e in result.errors]})
+                    return
+            else:
+                run = partial(sync_to_async(self.schema.execute), query, **kwargs)
+                if operation is not None and operation.operation == OperationType.QUERY and singleflight.enabled():
+                    key = singleflight.operation_key(
+                        query, kwargs["variable_values"], kwargs["operation_name"], _scope_key(self.scope)
+                    )
+                    result = await singleflight.get_async_singleflight().do(key, run)
+                else:
+                    result = await run()
+                await self.send({"id": op_id, "type": "next", "payload": _format_result(result)})
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("GraphQL websocket operation %s failed", op_id)
+            await self.send({"id": op_id, "type": "error", "payload": [{"message": "Internal server error"}]})
+            return
+        await self.send({"id": op_id, "type": "complete"})
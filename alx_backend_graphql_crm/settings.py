@@ -59,9 +59,38 @@ DATABASES = {
         "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
         "HOST": os.environ.get("DJANGO_DB_HOST", ""),
         "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+        # Keep connections open between requests and ping them before reuse.
+        "CONN_MAX_AGE": int(os.environ.get("DJANGO_DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.environ.get("DJANGO_DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"]["OPTIONS"] = {
+        "timeout": int(os.environ.get("DJANGO_SQLITE_TIMEOUT", "20")),
+    }
+
+# Cached counts (crm.counts) and the analytics generation are only shared
+# between processes (web, Celery, cron, archive_orders) through a shared cache.
+# Set DJANGO_CACHE_URL (e.g. redis://localhost:6379/2) in multi-process setups;
+# without it each process keeps its own and catches up when entries expire.
+if os.environ.get("DJANGO_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["DJANGO_CACHE_URL"],
+        }
+    }
+
+# Applied to every new SQLite connection by crm.db.configure_sqlite_connection.
+# Set a value to an empty string in the environment to leave that pragma alone.
+CRM_SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("CRM_SQLITE_JOURNAL_MODE", "WAL") or None,
+    "synchronous": os.environ.get("CRM_SQLITE_SYNCHRONOUS", "NORMAL") or None,
+    "mmap_size": os.environ.get("CRM_SQLITE_MMAP_SIZE", "134217728") or None,
+    "cache_size": os.environ.get("CRM_SQLITE_CACHE_SIZE", "-20000") or None,
+}
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
@@ -76,8 +105,50 @@ GRAPHENE = {
     "SCHEMA": "alx_backend_graphql_crm.schema.schema",
 }
 
+# Pub/sub backend for GraphQL subscriptions: "memory" (single process) or "redis".
+CRM_PUBSUB_BACKEND = os.environ.get("CRM_PUBSUB_BACKEND", "memory")
+CRM_PUBSUB_REDIS_URL = os.environ.get("CRM_PUBSUB_REDIS_URL", "redis://localhost:6379/1")
+CRM_PUBSUB_QUEUE_SIZE = int(os.environ.get("CRM_PUBSUB_QUEUE_SIZE", "100"))
+
+# Identical concurrent GraphQL queries share one execution (crm.singleflight).
+CRM_SINGLEFLIGHT_ENABLED = os.environ.get("CRM_SINGLEFLIGHT_ENABLED", "1") == "1"
+CRM_SINGLEFLIGHT_TIMEOUT = float(os.environ.get("CRM_SINGLEFLIGHT_TIMEOUT", "30"))
+
+# Count estimates (crm.counts): exact below this many rows, otherwise cached.
+CRM_COUNT_SMALL_TABLE_ROWS = int(os.environ.get("CRM_COUNT_SMALL_TABLE_ROWS", "10000"))
+CRM_COUNT_CACHE_TTL = int(os.environ.get("CRM_COUNT_CACHE_TTL", "30"))
+CRM_COUNT_TOTAL_TTL = int(os.environ.get("CRM_COUNT_TOTAL_TTL", "300"))
+
+# /export/orders is open to staff sessions and to "Authorization: Bearer <token>"
+# requests carrying this token; empty disables token access.
+CRM_EXPORT_TOKEN = os.environ.get("CRM_EXPORT_TOKEN", "")
+
+# Basket analytics arrays (crm.analytics) are rebuilt at least this often (seconds).
+CRM_ANALYTICS_TTL = int(os.environ.get("CRM_ANALYTICS_TTL", "600"))
+
+# Report snapshots (crm.reports) only consume rows created at least this many
+# seconds ago, so rows from transactions still committing are not skipped.
+CRM_REPORT_LAG = int(os.environ.get("CRM_REPORT_LAG", "60"))
+
+# Orders older than this many days are moved to the archive tables by archive_orders.
+CRM_ORDER_ARCHIVE_DAYS = int(os.environ.get("CRM_ORDER_ARCHIVE_DAYS", "365"))
+
 # Cron jobs for django-crontab
 CRONJOBS = [
-    ("*/5 * * * *", "crm.cron.logcrmheartbeat"),
+    ("*/5 * * * *", "crm.cron.log_crm_heartbeat"),
     ("0 */12 * * *", "crm.cron.updatelowstock"),
 ]
+
+# Celery (read by crm/celery.py; the beat schedule is defined there)
+CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+CELERY_ACCEPT_CONTENT = ["json"]
+CELERY_TASK_SERIALIZER = "json"
+CELERY_RESULT_SERIALIZER = "json"
+CELERY_TIMEZONE = "UTC"
+CELERY_TASK_DEFAULT_QUEUE = "crm.default"
+CELERY_TASK_ROUTES = {
+    "crm.tasks.generate_crm_report": {"queue": "crm.low"},
+    "crm.tasks.start_job": {"queue": "crm.high"},
+    # run_job_chunk/finish_job go to the queue of their job (crm.jobs).
+}
@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path
-from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
 
+from crm.views import CoalescingGraphQLView, export_orders_view, graphql_stats_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("graphql", csrf_exempt(GraphQLView.as_view(graphiql=True))),
+    path("graphql", csrf_exempt(CoalescingGraphQLView.as_view(graphiql=True))),
+    path("graphql/stats", graphql_stats_view, name="graphql-stats"),
+    path("export/orders", export_orders_view, name="export-orders"),
 ]
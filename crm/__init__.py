@@ -1,7 +1,17 @@
 # crm app
 
-# This will make sure the app is always imported when
-# Django starts so that shared_task will use this app.
-from .celery import app as celery_app
+# The Celery app is loaded on first access instead of at import time, so the
+# web server and cron runs do not pay for importing Celery. Celery workers
+# find it through ``celery -A crm`` (crm.celery), and crm.tasks imports it so
+# that enqueuing a task always uses the configured app.
+
+
+def __getattr__(name):
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ('celery_app',)
@@ -0,0 +1,103 @@
+"""Maintenance of the denormalized ``Customer`` activity columns.
+
+``order_count``, ``lifetime_value`` and ``last_order_date`` are bumped with
+``F()`` expressions in the same transaction that creates the orders, so
+concurrent writers never lose an update. Anything that bypasses these helpers
+(deletes, admin edits, raw SQL) is repaired by ``reconcile_customer_activity``.
+
+Because the columns can drift, anything destructive (``inactive_customers``)
+confirms them against the orders themselves.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ArchivedOrder, Customer, Order
+
+
+ACTIVITY_FIELDS = ("order_count", "lifetime_value", "last_order_date")
+
+
+def _bump(customer_id: int, count: int, amount: Decimal, latest) -> None:
+    Customer.objects.filter(pk=customer_id).update(
+        order_count=F("order_count") + count,
+        lifetime_value=F("lifetime_value") + amount,
+        # Greatest() is NULL if any argument is NULL on SQLite/Postgres.
+        last_order_date=Greatest(Coalesce(F("last_order_date"), Value(latest)), Value(latest)),
+    )
+
+
+def record_order(order: Order) -> None:
+    """Add one new order to its customer's activity columns."""
+    _bump(order.customer_id, 1, order.total_amount, order.order_date)
+
+
+def _activity(customer_ids: list[int]) -> dict:
+    """``(order_count, lifetime_value, last_order_date)`` per customer, hot and archived orders."""
+    actual = {}
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(customer_id__in=customer_ids)
+            .order_by()
+            .values("customer_id")
+            .annotate(order_count=Count("id"), lifetime_value=Sum("total_amount"), last_order_date=Max("order_date"))
+        )
+        for row in rows:
+            count, value, latest = actual.get(row["customer_id"], (0, Decimal("0.00"), None))
+            if row["last_order_date"] is not None and (latest is None or row["last_order_date"] > latest):
+                latest = row["last_order_date"]
+            actual[row["customer_id"]] = (
+                count + row["order_count"],
+                value + (row["lifetime_value"] or Decimal("0.00")),
+                latest,
+            )
+    return actual
+
+
+def reconcile_customer_activity(batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """Recompute the activity columns in primary-key batches.
+
+    Returns ``{"checked": n, "drifted": n}``; drifted rows are fixed unless
+    ``dry_run`` is set.
+    """
+    checked = drifted = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Customer.objects.filter(pk__gt=last_pk).order_by("pk").only("pk", *ACTIVITY_FIELDS)[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        checked += len(batch)
+        drifted += reconcile_customers(batch, dry_run=dry_run)
+    return {"checked": checked, "drifted": drifted}
+
+
+def reconcile_customers(customers: list[Customer], dry_run: bool = False) -> int:
+    """Fix the activity columns of ``customers``; returns how many had drifted."""
+    actual = _activity([c.pk for c in customers])
+    stale = []
+    for customer in customers:
+        expected = actual.get(customer.pk, (0, Decimal("0.00"), None))
+        if (customer.order_count, customer.lifetime_value, customer.last_order_date) != expected:
+            customer.order_count, customer.lifetime_value, customer.last_order_date = expected
+            stale.append(customer)
+    if stale and not dry_run:
+        Customer.objects.bulk_update(stale, ACTIVITY_FIELDS)
+    return len(stale)
+
+
+def inactive_customers(cutoff):
+    """Customers with no order, hot or archived, dated at or after ``cutoff``.
+
+    ``last_order_date`` narrows the candidates through its index; the
+    ``Exists`` checks keep a customer whose column has drifted behind their
+    actual orders from being selected.
+    """
+    return Customer.objects.filter(
+        Q(last_order_date__isnull=True) | Q(last_order_date__lt=cutoff),
+        ~Exists(Order.objects.filter(customer=OuterRef("pk"), order_date__gte=cutoff)),
+        ~Exists(ArchivedOrder.objects.filter(customer=OuterRef("pk"), order_date__gte=cutoff)),
+    )
@@ -1,20 +1,141 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+from .activity import ACTIVITY_FIELDS, reconcile_customers
+from .counts import estimate_count
 from .models import Customer, Product, Order
+from .schema import publish_stock_changes
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that only estimates counts above ``CRM_COUNT_SMALL_TABLE_ROWS``.
+
+    Up to the threshold the count is exact (a COUNT over at most threshold+1
+    rows). Above it the planner estimate from crm.counts is used, but never
+    below that bounded count, so stale statistics can't make a large table
+    look like a single page.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        threshold = getattr(settings, "CRM_COUNT_SMALL_TABLE_ROWS", 10000)
+        bounded = self.object_list.order_by()[: threshold + 1].count()
+        if bounded <= threshold:
+            return bounded
+        return max(estimate_count(self.object_list), bounded)
+
+
+class FastChangeListMixin:
+    paginator = EstimatedCountPaginator
+    ordering = ("-id",)
+    # Skip the second, unfiltered COUNT(*) the changelist runs for the header.
+    show_full_result_count = False
+
+
+def _prefix_range(field: str, prefix: str) -> Q:
+    # A range instead of LIKE/ILIKE so a plain B-tree index serves the search
+    # on every backend; the match is case-sensitive.
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + "\uffff"})
+
+
+class PrefixSearchMixin:
+    """Index-backed prefix search over ``prefix_search_fields``.
+
+    Unlike Django's default ``icontains`` search this matches prefixes only
+    and is case-sensitive; the term is also tried with its first letter
+    capitalized, so "ali" finds "Alice".
+    """
+
+    prefix_search_fields: tuple = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        variants = {search_term, search_term[:1].upper() + search_term[1:]}
+        condition = Q()
+        for field in self.prefix_search_fields:
+            for variant in variants:
+                condition |= _prefix_range(field, variant)
+        return queryset.filter(condition), False
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    list_display = ("id", "name", "email", "phone")
+class CustomerAdmin(FastChangeListMixin, PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ("id", "name", "email", "phone", "order_count", "lifetime_value", "last_order_date")
+    # Only used to enable the search box; see PrefixSearchMixin.
     search_fields = ("name", "email", "phone")
+    search_help_text = (
+        "Matches the start of name, email or phone. Case-sensitive, but a capitalized first letter is also tried."
+    )
+    prefix_search_fields = ("name", "email", "phone")
+    readonly_fields = ("order_count", "lifetime_value", "last_order_date")
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(FastChangeListMixin, PrefixSearchMixin, admin.ModelAdmin):
     list_display = ("id", "name", "price", "stock")
     search_fields = ("name",)
+    search_help_text = "Matches the start of the name. Case-sensitive, but a capitalized first letter is also tried."
+    prefix_search_fields = ("name",)
+    actions = ("restock",)
+
+    @admin.action(description="Restock selected products (+10)")
+    def restock(self, request, queryset):
+        with transaction.atomic():
+            previous_stock = dict(queryset.select_for_update().values_list("pk", "stock"))
+            Product.objects.filter(pk__in=previous_stock).update(stock=F("stock") + 10)
+            products = list(Product.objects.filter(pk__in=previous_stock))
+            # Same stockChanged events as the updateLowStockProducts mutation.
+            transaction.on_commit(lambda: publish_stock_changes(products, previous_stock))
+        self.message_user(request, f"Restocked {len(products)} products", messages.SUCCESS)
+
+
+class OrderProductInline(admin.TabularInline):
+    model = Order.products.through
+    extra = 0
+    autocomplete_fields = ("product",)
+    verbose_name = "item"
+    verbose_name_plural = "items"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ("id", "customer", "total_amount", "order_date")
-    autocomplete_fields = ("customer", "products")
+    list_select_related = ("customer",)
+    autocomplete_fields = ("customer",)
+    exclude = ("products",)
+    inlines = (OrderProductInline,)
+    actions = ("recalculate_totals",)
+
+    def save_related(self, request, form, formsets, change):
+        # Runs inside the change form's transaction.
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        order.recalculate_total()
+        order.save(update_fields=["total_amount"])
+        # The previous customer too, if the order was moved to another one.
+        _reconcile_activity({order.customer_id, form.initial.get("customer")})
+
+    @admin.action(description="Recalculate totals of selected orders")
+    def recalculate_totals(self, request, queryset):
+        with transaction.atomic():
+            customer_ids = set(queryset.values_list("customer_id", flat=True))
+            updated = queryset.recalculate_totals()
+            _reconcile_activity(customer_ids)
+        self.message_user(request, f"Recalculated {updated} orders", messages.SUCCESS)
+
+
+def _reconcile_activity(customer_ids) -> None:
+    """Recompute the crm.activity columns of the given customers."""
+    customers = Customer.objects.filter(pk__in=[pk for pk in customer_ids if pk is not None])
+    reconcile_customers(list(customers.only("pk", *ACTIVITY_FIELDS)))
@@ -0,0 +1,300 @@
+"""Vectorized basket analytics over all orders, hot and archived.
+
+Order lines are streamed with chunked ``values_list`` into NumPy arrays
+(order id, dense product index, current product price). Affinity,
+co-occurrence, price histograms and RFM segments are then computed on
+those arrays without a Python loop per order.
+
+The arrays are built once per process for each data-version stamp: the
+highest ids of the line, order and product tables plus a generation counter
+in the cache, bumped by signals on order/product writes. Writes that send no
+signals (``update()``, bulk operations) are picked up within
+``CRM_ANALYTICS_TTL`` seconds.
+
+NumPy is imported on first use, so processes that never run analytics do
+not load it.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from .models import ArchivedOrderProduct, Customer, Order, Product
+
+
+GENERATION_KEY = "crm:analytics:generation"
+CHUNK_SIZE = 20000
+# Upper bound on ``bins`` and on the number of ``edges`` per histogram.
+MAX_BUCKETS = 1000
+
+# Segments are checked in order; the first match wins. R and F are 1-5 quintile scores.
+RFM_SEGMENTS = (
+    ("champions", lambda r, f: (r >= 4) & (f >= 4)),
+    ("loyal", lambda r, f: f >= 4),
+    ("recent", lambda r, f: r >= 4),
+    ("at_risk", lambda r, f: (r <= 2) & (f >= 3)),
+    ("lost", lambda r, f: r <= 2),
+    ("regular", lambda r, f: r > 0),
+)
+
+
+class AnalyticsError(Exception):
+    pass
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise AnalyticsError("Analytics require NumPy (pip install numpy)") from None
+    return numpy
+
+
+def bump_data_version(**kwargs) -> None:
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+def track_analytics_version() -> None:
+    for model in (Order, Product):
+        uid = f"crm.analytics.{model._meta.label_lower}"
+        post_save.connect(bump_data_version, sender=model, dispatch_uid=uid)
+        post_delete.connect(bump_data_version, sender=model, dispatch_uid=uid)
+    m2m_changed.connect(bump_data_version, sender=Order.products.through, dispatch_uid="crm.analytics.order_products")
+
+
+def data_version() -> tuple:
+    return (
+        cache.get(GENERATION_KEY, 0),
+        Order.products.through.objects.aggregate(v=Max("id"))["v"],
+        ArchivedOrderProduct.objects.aggregate(v=Max("id"))["v"],
+        Order.objects.aggregate(v=Max("id"))["v"],
+        Product.objects.aggregate(v=Max("id"))["v"],
+    )
+
+
+def _stream(queryset, fields, dtype, convert=None, chunk_size: int = CHUNK_SIZE):
+    """``values_list`` rows as one 2-D array, converted ``chunk_size`` rows at a time."""
+    np = _numpy()
+    rows = queryset.order_by().values_list(*fields).iterator(chunk_size=chunk_size)
+    parts = []
+    while chunk := list(islice(rows, chunk_size)):
+        if convert is not None:
+            chunk = [convert(*row) for row in chunk]
+        parts.append(np.array(chunk, dtype=dtype))
+    return np.concatenate(parts) if parts else np.empty((0, len(fields)), dtype=dtype)
+
+
+@dataclass
+class Baskets:
+    product_ids: Any  # sorted Product ids
+    product_prices: Any  # aligned with product_ids
+    order_idx: Any  # per line: dense order index, lines sorted by it
+    product_idx: Any  # per line: index into product_ids
+    price: Any  # per line: current product price
+    order_offsets: Any  # first line of each order
+    _pairs: tuple | None = field(default=None, repr=False)
+
+    @property
+    def n_orders(self) -> int:
+        return len(self.order_offsets)
+
+    def product_index(self, product_id: int) -> int | None:
+        np = _numpy()
+        i = int(np.searchsorted(self.product_ids, product_id))
+        if i < len(self.product_ids) and self.product_ids[i] == product_id:
+            return i
+        return None
+
+    def orders_per_product(self):
+        # (order, product) is unique in both link tables: lines == orders.
+        return _numpy().bincount(self.product_idx, minlength=len(self.product_ids))
+
+
+def load_baskets() -> Baskets:
+    np = _numpy()
+    products = _stream(Product.objects.all(), ("id", "price"), np.float64, convert=lambda pk, price: (pk, float(price)))
+    by_id = np.argsort(products[:, 0])
+    product_ids, product_prices = products[by_id, 0].astype(np.int64), products[by_id, 1]
+
+    lines = np.concatenate(
+        [
+            _stream(Order.products.through.objects.all(), ("order_id", "product_id"), np.int64),
+            _stream(ArchivedOrderProduct.objects.all(), ("order_id", "product_id"), np.int64),
+        ]
+    )
+    lines = lines[np.isin(lines[:, 1], product_ids)]
+    lines = lines[np.lexsort((lines[:, 1], lines[:, 0]))]
+    _, order_offsets, order_idx = np.unique(lines[:, 0], return_index=True, return_inverse=True)
+    product_idx = np.searchsorted(product_ids, lines[:, 1])
+    return Baskets(
+        product_ids=product_ids,
+        product_prices=product_prices,
+        order_idx=order_idx.ravel(),
+        product_idx=product_idx,
+        price=product_prices[product_idx],
+        order_offsets=order_offsets,
+    )
+
+
+_cached: dict = {}
+_lock = threading.Lock()
+
+
+def get_baskets() -> Baskets:
+    """Baskets for the current data version, loaded at most once per version."""
+    version = data_version()
+    ttl = getattr(settings, "CRM_ANALYTICS_TTL", 600)
+    with _lock:
+        if _cached.get("version") == version and time.monotonic() - _cached["loaded"] < ttl:
+            return _cached["baskets"]
+        baskets = load_baskets()
+        _cached.update(version=version, loaded=time.monotonic(), baskets=baskets)
+        return baskets
+
+
+def product_affinity(product_id: int, top: int = 10, baskets: Baskets | None = None) -> list[dict]:
+    """Products most often bought with ``product_id``.
+
+    ``confidence`` is P(other | product) and ``lift`` is that divided by
+    P(other); lift above 1 means they are bought together more than chance.
+    """
+    np = _numpy()
+    baskets = baskets or get_baskets()
+    p = baskets.product_index(product_id)
+    if p is None or not baskets.n_orders:
+        return []
+    with_p = np.zeros(baskets.n_orders, dtype=bool)
+    with_p[baskets.order_idx[baskets.product_idx == p]] = True
+    n_with_p = int(with_p.sum())
+    if not n_with_p:
+        return []
+    together = np.bincount(baskets.product_idx[with_p[baskets.order_idx]], minlength=len(baskets.product_ids))
+    together[p] = 0
+    confidence = together / n_with_p
+    base_rate = baskets.orders_per_product() / baskets.n_orders
+    lift = np.divide(confidence, base_rate, out=np.zeros_like(confidence), where=base_rate > 0)
+    ranked = np.lexsort((-lift, -together))
+    ranked = ranked[together[ranked] > 0][:top]
+    return [
+        {
+            "product_id": int(baskets.product_ids[i]),
+            "orders": int(together[i]),
+            "confidence": float(confidence[i]),
+            "lift": float(lift[i]),
+        }
+        for i in ranked
+    ]
+
+
+def cooccurrence(baskets: Baskets | None = None):
+    """Sparse co-occurrence matrix: ``(pairs, counts)``.
+
+    ``pairs`` is an ``(m, 2)`` array of product-index pairs ``i < j`` and
+    ``counts`` the number of orders containing both. Orders are grouped by
+    basket size so that each group's pairs come from one fancy-index.
+    """
+    np = _numpy()
+    baskets = baskets or get_baskets()
+    if baskets._pairs is not None:
+        return baskets._pairs
+    n = len(baskets.product_ids)
+    sizes = np.diff(np.append(baskets.order_offsets, len(baskets.order_idx)))
+    keys = []
+    for k in np.unique(sizes[sizes >= 2]):
+        starts = baskets.order_offsets[sizes == k]
+        block = np.sort(baskets.product_idx[starts[:, None] + np.arange(k)], axis=1)
+        i, j = np.triu_indices(int(k), 1)
+        keys.append(block[:, i].ravel() * n + block[:, j].ravel())
+    if keys:
+        unique, counts = np.unique(np.concatenate(keys), return_counts=True)
+        pairs = np.stack([unique // n, unique % n], axis=1)
+    else:
+        pairs, counts = np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int64)
+    baskets._pairs = (pairs, counts)
+    return baskets._pairs
+
+
+def top_product_pairs(top: int = 10, baskets: Baskets | None = None) -> list[dict]:
+    np = _numpy()
+    baskets = baskets or get_baskets()
+    pairs, counts = cooccurrence(baskets)
+    ranked = np.argsort(-counts, kind="stable")[:top]
+    return [
+        {"product_ids": [int(baskets.product_ids[a]) for a in pairs[r]], "orders": int(counts[r])}
+        for r in ranked
+    ]
+
+
+def revenue_by_price_bucket(bins: int = 10, edges: list[float] | None = None, baskets: Baskets | None = None) -> list[dict]:
+    """Items sold and revenue per product price bucket (current prices)."""
+    np = _numpy()
+    if edges is not None:
+        if not 2 <= len(edges) <= MAX_BUCKETS:
+            raise AnalyticsError(f"edges needs between 2 and {MAX_BUCKETS} values")
+        edges = np.asarray(sorted(edges), dtype=np.float64)
+    elif not 1 <= bins <= MAX_BUCKETS:
+        raise AnalyticsError(f"bins must be between 1 and {MAX_BUCKETS}")
+    baskets = baskets or get_baskets()
+    if not len(baskets.price):
+        return []
+    items, bucket_edges = np.histogram(baskets.price, bins=edges if edges is not None else bins)
+    revenue, _ = np.histogram(baskets.price, bins=bucket_edges, weights=baskets.price)
+    return [
+        {"low": float(bucket_edges[b]), "high": float(bucket_edges[b + 1]), "items": int(items[b]), "revenue": float(revenue[b])}
+        for b in range(len(items))
+    ]
+
+
+def _quintile_scores(values):
+    """1-5 by rank, higher values scoring higher.
+
+    Ties share the score of their average rank -- the midpoint of the tied
+    run -- so a lone customer, or a group that all tie, scores 3 rather than
+    landing in the bottom bucket.
+    """
+    np = _numpy()
+    if not len(values):
+        return values.astype(np.int64)
+    ordered = np.sort(values)
+    # left + right is twice the midpoint of each value's run in ``ordered``.
+    doubled = np.searchsorted(ordered, values, side="left") + np.searchsorted(ordered, values, side="right")
+    return 1 + (doubled * 5) // (2 * len(values))
+
+
+def rfm_segments(now=None) -> list[dict]:
+    """Customers and revenue per RFM segment.
+
+    Uses the denormalized ``Customer`` activity columns (crm.activity), so it
+    reads one row per customer who has ordered.
+    """
+    np = _numpy()
+    now = (now or timezone.now()).timestamp()
+    data = _stream(
+        Customer.objects.filter(order_count__gt=0, last_order_date__isnull=False),
+        ("order_count", "lifetime_value", "last_order_date"),
+        np.float64,
+        convert=lambda count, value, last: (count, float(value), last.timestamp()),
+    )
+    if not len(data):
+        return []
+    frequency, monetary, last_ts = data[:, 0], data[:, 1], data[:, 2]
+    r = _quintile_scores(-(now - last_ts))
+    f = _quintile_scores(frequency)
+    assigned = np.zeros(len(data), dtype=bool)
+    result = []
+    for name, rule in RFM_SEGMENTS:
+        members = rule(r, f) & ~assigned
+        assigned |= members
+        result.append({"segment": name, "customers": int(members.sum()), "revenue": float(monetary[members].sum())})
+    return result
+
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CrmConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "crm"
+
+    def ready(self):
+        from .analytics import track_analytics_version
+        from .counts import track_model_totals
+        from .db import configure_sqlite_connection
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid="crm.db.sqlite_pragmas")
+        track_model_totals(self.get_model("Customer"), self.get_model("Product"), self.get_model("Order"))
+        track_analytics_version()
@@ -0,0 +1,101 @@
+"""Archival of old orders into ``ArchivedOrder``/``ArchivedOrderProduct``.
+
+Orders older than ``CRM_ORDER_ARCHIVE_DAYS`` are moved in ``(order_date, id)``
+order, one short transaction per batch: copy the orders and their product
+links, then delete them from the hot tables. An interrupted run leaves every
+batch either fully moved or untouched, so the command can simply be rerun.
+
+``allOrders`` reads the hot table only, unless ``orderDateGte`` is older than
+the newest archived order; then it UNIONs in the matching archived rows.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.utils import timezone
+
+from .counts import invalidate_total
+from .models import ArchivedOrder, ArchivedOrderProduct, Order
+
+
+ORDER_COLUMNS = ("id", "customer_id", "total_amount", "order_date", "created_at")
+
+
+def archive_cutoff(now=None, days: int | None = None):
+    days = getattr(settings, "CRM_ORDER_ARCHIVE_DAYS", 365) if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def _archive_batch(cutoff, batch_size: int) -> int:
+    with transaction.atomic():
+        rows = list(
+            # Row locks keep concurrent writers from linking products to an
+            # order between copying its links and deleting it.
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(order_date__lt=cutoff)
+            .order_by("order_date", "id")
+            .values_list(*ORDER_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        through = Order.products.through
+        links = through.objects.filter(order_id__in=ids).values_list("order_id", "product_id")
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**dict(zip(ORDER_COLUMNS, row))) for row in rows])
+        ArchivedOrderProduct.objects.bulk_create(
+            [ArchivedOrderProduct(order_id=order_id, product_id=product_id) for order_id, product_id in links]
+        )
+        through.objects.filter(order_id__in=ids).delete()
+        # A plain DELETE: nothing else references orders, and Order.delete()
+        # would load every row again to send post_delete one order at a time.
+        Order.objects.filter(pk__in=ids)._raw_delete(Order.objects.db)
+    return len(rows)
+
+
+def archive_orders(cutoff=None, batch_size: int = 500, max_batches: int | None = None, pause: float = 0.0) -> int:
+    """Move orders dated before ``cutoff`` into the archive; returns how many moved."""
+    cutoff = cutoff or archive_cutoff()
+    moved = batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            count = _archive_batch(cutoff, batch_size)
+            moved += count
+            batches += 1
+            if count < batch_size:
+                break
+            if pause:
+                # Let other writers in between batches.
+                time.sleep(pause)
+    finally:
+        if moved:
+            # The raw deletes send no signals. This reaches other processes
+            # only through a shared cache (DJANGO_CACHE_URL); elsewhere their
+            # cached totals, used for estimates only, expire on their own.
+            invalidate_total(Order)
+            invalidate_total(ArchivedOrder)
+    return moved
+
+
+def archive_reaches(since) -> bool:
+    """Whether orders dated at or after ``since`` may be in the archive."""
+    if since is None:
+        return False
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    newest = ArchivedOrder.objects.order_by("-order_date").values_list("order_date", flat=True).first()
+    return newest is not None and since <= newest
+
+
+def with_archive(hot, archived):
+    """UNION ALL of filtered ``Order`` and ``ArchivedOrder`` querysets.
+
+    Rows come back as ``Order`` instances; archived ones have ``is_archived``
+    set. The hot queryset's ordering (or ``id``) is applied to the union.
+    """
+    ordering = [str(field) for field in hot.query.order_by] or ["id"]
+    hot = hot.order_by().annotate(is_archived=Value(False, output_field=BooleanField()))
+    archived = archived.order_by().annotate(is_archived=Value(True, output_field=BooleanField()))
+    return hot.union(archived, all=True).order_by(*ordering)
@@ -1,8 +1,13 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
+from kombu import Queue
+
+from .joblog import shutdown as shutdown_job_logs
 
 # Set the default Django settings module for the 'celery' program.
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql_crm.settings')
 
 app = Celery('crm')
 
@@ -10,6 +15,24 @@ app = Celery('crm')
 # the configuration object to child processes.
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
+# Quick jobs (crm.high) get their own queue so that chunks of long jobs
+# (crm.low) cannot hold them up; see crm.jobs. Run a worker per queue, e.g.
+# ``celery -A crm worker -Q crm.high,crm.default`` and ``-Q crm.low``.
+app.conf.task_queues = [Queue("crm.high"), Queue("crm.default"), Queue("crm.low")]
+
+# Defined here rather than in settings so that only Celery processes
+# import celery.schedules.
+app.conf.beat_schedule = {
+    'generate-crm-report': {
+        'task': 'crm.tasks.generate_crm_report',
+        'schedule': crontab(day_of_week='mon', hour=6, minute=0),
+    },
+}
+
+# Prefork children leave through os._exit, skipping atexit: drain the job
+# log queues explicitly so their last records reach the files.
+worker_process_shutdown.connect(shutdown_job_logs, weak=False)
+
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
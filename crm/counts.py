@@ -0,0 +1,149 @@
+"""Count estimates for GraphQL connections and the admin.
+
+graphene-django slices every connection with an exact ``queryset.count()``,
+and ``totalCount`` reuses that number, so pagination never depends on a
+cached count. ``estimate_count`` backs ``totalCountEstimate`` and the admin
+paginator with planner statistics (``pg_class.reltuples`` / ``EXPLAIN`` on
+Postgres, ``sqlite_stat1`` after ``ANALYZE`` on SQLite) and otherwise falls
+back to ``strategy_count``:
+
+* unfiltered: the model total kept in the cache by ``post_save``/``post_delete``
+  signals (recounted when missing, expires after ``CRM_COUNT_TOTAL_TTL``);
+* filtered on a small table: an exact ``COUNT(*)``;
+* filtered on a large table: an exact ``COUNT(*)`` cached per filter
+  fingerprint for ``CRM_COUNT_CACHE_TTL`` seconds.
+
+Counts live in Django's cache. With the default per-process LocMemCache a
+write in another process is only seen once the cached value expires.
+"""
+import hashlib
+import json
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, models, transaction
+from django.db.models.signals import post_delete, post_save
+
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name: str, default: int) -> int:
+    return getattr(settings, name, default)
+
+
+def _total_key(model) -> str:
+    return f"crm:count:total:{model._meta.label_lower}"
+
+
+def _is_unfiltered(queryset) -> bool:
+    query = queryset.query
+    return not query.where and not query.distinct and not query.is_sliced and not query.combinator
+
+
+def model_total(model) -> int:
+    key = _total_key(model)
+    total = cache.get(key)
+    if total is None:
+        total = model._base_manager.count()
+        cache.add(key, total, _setting("CRM_COUNT_TOTAL_TTL", 300))
+    return total
+
+
+def invalidate_total(model) -> None:
+    """Drop the cached total after writes that bypass signals (bulk_create, raw SQL)."""
+    cache.delete(_total_key(model))
+
+
+def _adjust_total(model, delta: int) -> None:
+    try:
+        cache.incr(_total_key(model), delta)
+    except ValueError:
+        # Not cached yet; the next read recounts.
+        pass
+
+
+# Deltas are applied once the write commits, so a rolled-back save or delete
+# never moves the cached total.
+def _on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if created:
+        transaction.on_commit(partial(_adjust_total, sender, 1), using=using)
+
+
+def _on_delete(sender, instance, using=None, **kwargs):
+    transaction.on_commit(partial(_adjust_total, sender, -1), using=using)
+
+
+def track_model_totals(*model_classes) -> None:
+    for model in model_classes:
+        uid = f"crm.counts.{model._meta.label_lower}"
+        post_save.connect(_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_delete, sender=model, dispatch_uid=uid)
+
+
+def _fingerprint(queryset) -> str:
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha1(f"{queryset.db}:{sql}:{params!r}".encode("utf-8")).hexdigest()
+    return f"crm:count:filtered:{queryset.model._meta.label_lower}:{digest}"
+
+
+def strategy_count(queryset) -> int:
+    if _is_unfiltered(queryset):
+        return model_total(queryset.model)
+    if model_total(queryset.model) <= _setting("CRM_COUNT_SMALL_TABLE_ROWS", 10000):
+        return models.QuerySet.count(queryset)
+    key = _fingerprint(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = models.QuerySet.count(queryset)
+        cache.set(key, count, _setting("CRM_COUNT_CACHE_TTL", 30))
+    return count
+
+
+def planner_rows(model, using: str = "default") -> int | None:
+    """Row count from the planner statistics, or None if there are none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+                row = cursor.fetchone()
+                # reltuples is -1 until the table has been vacuumed/analyzed.
+                return int(row[0]) if row and row[0] >= 0 else None
+            if connection.vendor == "sqlite":
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s", [table])
+                counts = [int(stat.split()[0]) for (stat,) in cursor.fetchall() if stat]
+                return max(counts) if counts else None
+    except DatabaseError:
+        # e.g. sqlite_stat1 does not exist before the first ANALYZE.
+        return None
+    return None
+
+
+def _explain_rows(queryset) -> int | None:
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError:
+        logger.exception("EXPLAIN failed for %s", queryset.model._meta.label)
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(queryset) -> int:
+    if _is_unfiltered(queryset):
+        estimate = planner_rows(queryset.model, queryset.db)
+        return estimate if estimate is not None else model_total(queryset.model)
+    estimate = _explain_rows(queryset)
+    return estimate if estimate is not None else strategy_count(queryset)
+
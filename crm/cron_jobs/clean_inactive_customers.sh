@@ -14,21 +14,20 @@ cd "$PROJECT_DIR"
 python manage.py shell -c "
 from datetime import datetime, timedelta
 from django.utils import timezone
-from crm.models import Customer
+from crm.activity import inactive_customers
 
 # Calculate date one year ago
 one_year_ago = timezone.now() - timedelta(days=365)
 
-# Find customers with no orders since one year ago
-inactive_customers = Customer.objects.filter(orders__isnull=True).union(
-    Customer.objects.filter(orders__order_date__lt=one_year_ago).distinct()
-)
+# Find customers with no orders since one year ago (the indexed
+# last_order_date, confirmed against their hot and archived orders)
+inactive = inactive_customers(one_year_ago)
 
 # Count before deletion
-count = inactive_customers.count()
+count = inactive.count()
 
 # Delete inactive customers
-inactive_customers.delete()
+inactive.delete()
 
 # Log the result
 timestamp = datetime.now().strftime('%d/%m/%Y-%H:%M:%S')
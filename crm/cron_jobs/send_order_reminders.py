@@ -6,16 +6,26 @@ from pathlib import Path
 from gql import Client, gql
 from gql.transport.requests import RequestsHTTPTransport
 
+# Run directly by cron, so make the project importable.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from crm.joblog import get_job_logger, job_run  # noqa: E402
+
 
 GRAPHQL_URL = "http://localhost:8000/graphql"
 LOG_FILE = Path("/tmp/order_reminders_log.txt")
 
 
-def timestamp() -> str:
-    return datetime.now().strftime("%d/%m/%Y-%H:%M:%S")
+def main() -> int:
+    logger = get_job_logger("order_reminders", LOG_FILE)
+    with job_run(logger) as run:
+        send_reminders(run)
 
+    print("Order reminders processed!")
+    return 0
 
-def main() -> int:
+
+def send_reminders(run) -> None:
     try:
         transport = RequestsHTTPTransport(url=GRAPHQL_URL, retries=2, verify=True)
         client = Client(transport=transport, fetch_schema_from_transport=False)
@@ -34,24 +44,19 @@ def main() -> int:
         )
         result = client.execute(query, variable_values={"since": since_iso})
         edges = result.get("allOrders", {}).get("edges", [])
-        lines = [
-            f"{timestamp()} Reminder for order {n['node']['id']} -> {n['node']['customer']['email']}\n"
-            for n in edges
-            if n and n.get("node") and n["node"].get("customer")
-        ]
     except Exception as e:
-        lines = [f"{timestamp()} Error querying GraphQL: {e}\n"]
-
-    try:
-        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with LOG_FILE.open("a", encoding="utf-8") as f:
-            for line in lines:
-                f.write(line)
-    except Exception:
-        pass
-
-    print("Order reminders processed!")
-    return 0
+        run.error("Error querying GraphQL", error=str(e))
+        return
+
+    for n in edges:
+        if n and n.get("node") and n["node"].get("customer"):
+            node = n["node"]
+            run.info(
+                f"Reminder for order {node['id']} -> {node['customer']['email']}",
+                order=node["id"],
+                email=node["customer"]["email"],
+            )
+            run.rows += 1
 
 
 if __name__ == "__main__":
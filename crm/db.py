@@ -0,0 +1,64 @@
+"""Connection tuning for the CRM database layer.
+
+Django keeps connections open for ``CONN_MAX_AGE`` seconds and pings them
+before reuse when ``CONN_HEALTH_CHECKS`` is on (see the project settings).
+This module adds the per-connection setup that SQLite needs on top of that:
+every new connection gets the pragmas from ``settings.CRM_SQLITE_PRAGMAS``.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PRAGMAS = {
+    # WAL lets the cron jobs read while the web process writes.
+    "journal_mode": "WAL",
+    # Safe with WAL; only the last transactions may roll back on power loss.
+    "synchronous": "NORMAL",
+    "mmap_size": 134217728,
+    # Negative values are KiB, so this is ~20MB of page cache per connection.
+    "cache_size": -20000,
+}
+
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+_PRAGMA_VALUE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def get_sqlite_pragmas() -> dict:
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas.update(getattr(settings, "CRM_SQLITE_PRAGMAS", {}) or {})
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_sqlite_pragmas(cursor, pragmas: dict) -> None:
+    for name, value in pragmas.items():
+        if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(str(value)):
+            logger.warning("Skipping invalid SQLite pragma %s=%r", name, value)
+            continue
+        cursor.execute(f"PRAGMA {name}={value}")
+
+
+def configure_sqlite_connection(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver applying the SQLite pragmas."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, get_sqlite_pragmas())
+
+
+def check_connections() -> dict:
+    """Return ``{alias: usable}`` for every configured database."""
+    status = {}
+    for alias in connections:
+        conn = connections[alias]
+        try:
+            conn.ensure_connection()
+            status[alias] = conn.is_usable()
+        except Exception:
+            logger.exception("Database %s is not reachable", alias)
+            status[alias] = False
+    return status
@@ -0,0 +1,152 @@
+"""Streaming order export shared by the export view and ``export_orders``.
+
+Orders are read with ``values_list(...).iterator(chunk_size=...)`` and the
+product ids for each chunk are fetched with one query on the through table,
+so memory stays bounded by the chunk size no matter how many orders match.
+
+Under ASGI, Django reads a sync streaming iterator into one list before
+sending it, so the view hands ASGI requests ``astream`` instead.
+"""
+import csv
+import json
+import zlib
+from collections import defaultdict
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+
+from .filters import OrderFilter
+from .models import Order
+
+
+DEFAULT_CHUNK_SIZE = 2000
+MAX_CHUNK_SIZE = 10000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_COLUMNS = ("id", "customer_email", "total_amount", "order_date", "created_at", "product_ids")
+ORDER_VALUES = ("id", "customer__email", "total_amount", "order_date", "created_at")
+
+
+class ExportError(ValueError):
+    pass
+
+
+def filtered_orders(filter_data=None):
+    """Apply the same arguments ``allOrders`` accepts (snake_case names)."""
+    filterset = OrderFilter(data=filter_data or {}, queryset=Order.objects.all())
+    if not filterset.is_valid():
+        raise ExportError("; ".join(f"{field}: {' '.join(msgs)}" for field, msgs in filterset.errors.items()))
+    return filterset.qs
+
+
+def iter_order_rows(queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[tuple]:
+    through = Order.products.through
+    rows = queryset.order_by("id").values_list(*ORDER_VALUES).iterator(chunk_size=chunk_size)
+    chunk: list[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_product_ids(chunk, through)
+            chunk = []
+    if chunk:
+        yield from _with_product_ids(chunk, through)
+
+
+def _with_product_ids(chunk: list[tuple], through) -> Iterator[tuple]:
+    product_ids = defaultdict(list)
+    links = (
+        through.objects.filter(order_id__in=[row[0] for row in chunk])
+        .order_by("order_id", "product_id")
+        .values_list("order_id", "product_id")
+    )
+    for order_id, product_id in links:
+        product_ids[order_id].append(product_id)
+    for row in chunk:
+        yield row + (product_ids.get(row[0], []),)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def render_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    for order_id, email, total, order_date, created_at, product_ids in rows:
+        yield json.dumps(
+            {
+                "id": order_id,
+                "customer_email": email,
+                "total_amount": str(total),
+                "order_date": _isoformat(order_date),
+                "created_at": _isoformat(created_at),
+                "product_ids": product_ids,
+            }
+        ) + "\n"
+
+
+class _LineBuffer:
+    """File-like object returning what ``csv.writer`` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for order_id, email, total, order_date, created_at, product_ids in rows:
+        yield writer.writerow(
+            [
+                order_id,
+                email,
+                total,
+                _isoformat(order_date),
+                _isoformat(created_at),
+                " ".join(str(pk) for pk in product_ids),
+            ]
+        )
+
+
+RENDERERS = {
+    "ndjson": render_ndjson,
+    "csv": render_csv,
+}
+
+
+def gzip_stream(chunks: Iterable[str], flush_every: int = 256 * 1024) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        pending += len(chunk)
+        if pending >= flush_every:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def astream(chunks: Iterable, batch_size: int = 256) -> AsyncIterator:
+    """Async iterator over ``chunks``, pulling ``batch_size`` at a time in a worker thread.
+
+    The calls are thread-sensitive, so every batch runs on the thread that
+    holds the database connection (and server-side cursor) of the request.
+    """
+    chunks = iter(chunks)
+    next_batch = sync_to_async(lambda: list(islice(chunks, batch_size)), thread_sensitive=True)
+    while batch := await next_batch():
+        yield b"".join(batch) if isinstance(batch[0], bytes) else "".join(batch)
+
+
+def export_orders(filter_data=None, fmt: str = "ndjson", chunk_size: int = DEFAULT_CHUNK_SIZE, gzip: bool = False):
+    """Return an iterator of ``str`` (or ``bytes`` when gzipped) export chunks."""
+    if fmt not in RENDERERS:
+        raise ExportError(f"Unsupported format '{fmt}'")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ExportError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}")
+    queryset = filtered_orders(filter_data)
+    stream = RENDERERS[fmt](iter_order_rows(queryset, chunk_size=chunk_size))
+    return gzip_stream(stream) if gzip else stream
@@ -1,7 +1,7 @@
 import django_filters
-from django.db.models import Q
+from django.db.models import Exists, OuterRef
 
-from .models import Customer, Product, Order
+from .models import ArchivedOrder, Customer, Product, Order
 
 
 class CustomerFilter(django_filters.FilterSet):
@@ -10,6 +10,8 @@ class CustomerFilter(django_filters.FilterSet):
     created_at_gte = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
     created_at_lte = django_filters.IsoDateTimeFilter(field_name="created_at", lookup_expr="lte")
     phone_pattern = django_filters.CharFilter(method="filter_phone_pattern")
+    last_order_before = django_filters.IsoDateTimeFilter(field_name="last_order_date", lookup_expr="lt")
+    lifetime_value_gte = django_filters.NumberFilter(field_name="lifetime_value", lookup_expr="gte")
 
     class Meta:
         model = Customer
@@ -19,6 +21,8 @@ class CustomerFilter(django_filters.FilterSet):
             "created_at_gte",
             "created_at_lte",
             "phone_pattern",
+            "last_order_before",
+            "lifetime_value_gte",
         ]
 
     def filter_phone_pattern(self, queryset, name, value):
@@ -66,15 +70,33 @@ class OrderFilter(django_filters.FilterSet):
             return queryset
         return queryset.filter(customer__name__icontains=value)
 
+    # The M2M filters are semi-joins rather than joins on the through table,
+    # so matching orders are never duplicated and no DISTINCT is needed.
     def filter_product_name(self, queryset, name, value):
         if not value:
             return queryset
-        return queryset.filter(products__name__icontains=value).distinct()
+        return queryset.filter(
+            Exists(_order_products(queryset).filter(order_id=OuterRef("pk"), product__name__icontains=value))
+        )
 
     def filter_product_id(self, queryset, name, value):
         if not value:
             return queryset
-        return queryset.filter(products__id=value).distinct()
+        # A single product matches few orders: let the database start from the
+        # through table's product_id index instead of probing every order.
+        return queryset.filter(pk__in=_order_products(queryset).filter(product_id=value).values("order_id"))
+
+
+class ArchivedOrderFilter(OrderFilter):
+    """``OrderFilter`` over ``ArchivedOrder``, for the archive half of ``allOrders``."""
+
+    class Meta(OrderFilter.Meta):
+        model = ArchivedOrder
+
+
+def _order_products(queryset):
+    # Order and ArchivedOrder link tables share the order_id/product_id columns.
+    return queryset.model.products.through.objects.all()
 
 
 
@@ -0,0 +1,220 @@
+"""Non-blocking JSON-lines logging for cron and Celery jobs.
+
+Jobs only put records on an in-memory queue (``QueueHandler``); a background
+``QueueListener`` per log file does the file I/O, rotates the file by size
+and fsyncs in batches. Cron, Celery prefork children and chunk tasks append
+to the same files, so writes and rotation happen under an exclusive lock on
+``<file>.lock`` and a handler reopens the file when another process has
+rotated it. Each record is one JSON object per line, and
+``job_run`` adds ``duration_ms``/``rows``/``status`` for every run so the
+files can be parsed for performance trending.
+
+Standard library only: ``send_order_reminders.py`` uses it outside Django.
+Celery children exit without running ``atexit``, so ``crm.celery`` calls
+``shutdown`` on ``worker_process_shutdown``.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only.
+    fcntl = None
+
+
+MAX_BYTES = int(os.environ.get("CRM_JOB_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUP_COUNT = int(os.environ.get("CRM_JOB_LOG_BACKUPS", "5"))
+FSYNC_EVERY = int(os.environ.get("CRM_JOB_LOG_FSYNC_EVERY", "50"))
+FSYNC_INTERVAL = float(os.environ.get("CRM_JOB_LOG_FSYNC_INTERVAL", "5"))
+
+_LOGGER_PREFIX = "crm.jobs."
+
+
+class JSONLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "job": record.name.removeprefix(_LOGGER_PREFIX),
+            "message": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class BatchedFsyncRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file that is fsynced every N records or T seconds.
+
+    Safe to share between processes: see the module docstring.
+    """
+
+    def __init__(self, filename, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT,
+                 fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock_fd = None
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.baseFilename + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+            rotated = not os.path.samestat(current, os.fstat(self.stream.fileno()))
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.sync()
+            self.stream.close()
+            self.stream = None  # FileHandler.emit reopens baseFilename.
+
+    def emit(self, record):
+        with self._file_lock():
+            self._reopen_if_rotated()
+            super().emit(record)
+        self._pending += 1
+        if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self.stream and self._pending:
+            self.stream.flush()
+            os.fsync(self.stream.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def doRollover(self):
+        self.sync()
+        super().doRollover()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.sync()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.release()
+        super().close()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+class _JobQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Render message and traceback on the caller's thread, keep the
+        # structured fields for the JSON formatter on the listener side.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listeners: dict[str, tuple[logging.Handler, logging.handlers.QueueListener]] = {}
+_lock = threading.Lock()
+
+
+def _queue_handler_for(path: Path) -> logging.Handler:
+    key = str(path)
+    with _lock:
+        if key not in _listeners:
+            file_handler = BatchedFsyncRotatingFileHandler(key)
+            file_handler.setFormatter(JSONLineFormatter())
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=False)
+            listener.start()
+            _listeners[key] = (_JobQueueHandler(log_queue), listener)
+        return _listeners[key][0]
+
+
+def get_job_logger(job: str, path) -> logging.Logger:
+    """Return the logger for ``job`` writing JSON lines to ``path``."""
+    logger = logging.getLogger(_LOGGER_PREFIX + job)
+    handler = _queue_handler_for(Path(path))
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+@atexit.register
+def shutdown(**kwargs) -> None:
+    """Drain every queue and fsync/close the files (also runs at exit).
+
+    Accepts signal keyword arguments so it can be connected directly.
+    """
+    with _lock:
+        listeners = list(_listeners.values())
+        _listeners.clear()
+    for _, listener in listeners:
+        listener.stop()
+        for file_handler in listener.handlers:
+            file_handler.close()
+
+
+class JobRun:
+    def __init__(self, logger: logging.Logger, fields: dict):
+        self.logger = logger
+        self.fields = fields
+        self.rows = 0
+        self.status = "ok"
+
+    def _log(self, level: int, message: str, fields: dict, exc_info=False) -> None:
+        self.logger.log(level, message, exc_info=exc_info, extra={"fields": {**self.fields, **fields}})
+
+    def info(self, message: str, **fields) -> None:
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields) -> None:
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, exc_info=False, **fields) -> None:
+        self.status = "error"
+        self._log(logging.ERROR, message, fields, exc_info=exc_info)
+
+
+@contextmanager
+def job_run(logger: logging.Logger, **fields):
+    """Time a job run and log its outcome with ``duration_ms`` and ``rows``."""
+    run = JobRun(logger, fields)
+    started = time.perf_counter()
+    try:
+        yield run
+    except Exception:
+        duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        run.error("job failed", exc_info=True, status="error", duration_ms=duration_ms, rows=run.rows)
+        raise
+    duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    run.info("job finished", status=run.status, duration_ms=duration_ms, rows=run.rows)
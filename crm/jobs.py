@@ -0,0 +1,297 @@
+"""Chunked, idempotent CRM jobs.
+
+A job is split into primary-key ranges of its queryset; ``crm.tasks``
+fans the ranges out as a Celery ``chord`` of ``run_job_chunk`` tasks on
+the job's queue and combines the results in ``finish_job``.
+
+Every chunk has a ``JobChunk`` row keyed by ``(job, run_key, lo)``. A
+chunk's database work and its ``done`` mark commit in one transaction, so
+a retried or redelivered chunk is skipped instead of applied twice, and a
+run dispatched again with the same ``run_key`` only does the chunks that
+are not done yet, with the params prepared for its first dispatch. A chunk
+is claimed by a conditional ``UPDATE`` from pending/failed to running, so
+only one worker runs it at a time on every backend. A chunk left running
+past ``STALE_AFTER`` can be claimed again; the claim's ``started_at`` fences
+the ``done`` update, so if the first worker was merely slow, whichever
+worker no longer holds the claim rolls its work back. Side effects outside the database (log lines) are at
+least once. Each chunk's duration is stored on its row and logged.
+
+This module does not import Celery; the web process can use it.
+"""
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .activity import ACTIVITY_FIELDS, inactive_customers, reconcile_customers
+from .joblog import get_job_logger, job_run
+from .models import Customer, JobChunk, Order
+
+
+JOBS_LOG = Path("/tmp/crm_jobs_log.txt")
+REMINDERS_LOG = Path("/tmp/order_reminders_log.txt")
+
+QUEUE_HIGH = "crm.high"
+QUEUE_DEFAULT = "crm.default"
+QUEUE_LOW = "crm.low"
+
+# A chunk left running this long (its worker died) may be claimed again.
+STALE_AFTER = timedelta(hours=1)
+# run_job_chunk retries a busy chunk this often until it can be reclaimed.
+BUSY_RETRY_DELAY = 30
+BUSY_MAX_RETRIES = int(STALE_AFTER.total_seconds() // BUSY_RETRY_DELAY) + 1
+
+JOBS: dict[str, "ChunkedJob"] = {}
+
+
+class ChunkBusy(Exception):
+    """The chunk is being run by another worker; retry later."""
+
+
+class ChunkLost(Exception):
+    """The chunk was reclaimed by another worker while this one ran it."""
+
+
+def register(job_class):
+    JOBS[job_class.name] = job_class()
+    return job_class
+
+
+def get_job(name: str) -> "ChunkedJob":
+    try:
+        return JOBS[name]
+    except KeyError:
+        raise ValueError(f"Unknown job {name!r}; choose from {', '.join(sorted(JOBS))}") from None
+
+
+class ChunkedJob:
+    name = ""
+    queue = QUEUE_DEFAULT
+    chunk_size = 1000
+
+    def prepare(self, params: dict) -> dict:
+        """Resolve defaults once at dispatch (e.g. "now"), so every chunk agrees."""
+        return params
+
+    def queryset(self, params: dict):
+        raise NotImplementedError
+
+    def process(self, queryset, params: dict, run) -> dict:
+        """Apply the job to one chunk; the returned dict must be JSON-serializable."""
+        raise NotImplementedError
+
+    def combine(self, results: list[dict], params: dict) -> dict:
+        combined: dict = {}
+        for result in results:
+            for key, value in (result or {}).items():
+                combined[key] = combined.get(key, 0) + value
+        return combined
+
+
+def _since(params: dict, key: str, days: int) -> dict:
+    if key not in params:
+        params = {**params, key: (timezone.now() - timedelta(days=params.get("days", days))).isoformat()}
+    return params
+
+
+@register
+class OrderStatsJob(ChunkedJob):
+    """Order count and revenue since ``since`` (default: the last 7 days)."""
+
+    name = "order_stats"
+    queue = QUEUE_LOW
+    chunk_size = 5000
+
+    def prepare(self, params):
+        return _since(params, "since", 7)
+
+    def queryset(self, params):
+        return Order.objects.filter(order_date__gte=parse_datetime(params["since"]))
+
+    def process(self, queryset, params, run):
+        stats = queryset.aggregate(orders=Count("id"), revenue=Sum("total_amount"))
+        revenue = (stats["revenue"] or Decimal("0.00")).quantize(Decimal("0.01"))
+        return {"orders": stats["orders"], "revenue": str(revenue)}
+
+    def combine(self, results, params):
+        return {
+            "orders": sum(r["orders"] for r in results),
+            "revenue": str(sum((Decimal(r["revenue"]) for r in results), Decimal("0.00"))),
+        }
+
+
+@register
+class OrderRemindersJob(ChunkedJob):
+    """Log a reminder for every order placed since ``since`` (default: 7 days)."""
+
+    name = "order_reminders"
+    queue = QUEUE_HIGH
+
+    def prepare(self, params):
+        return _since(params, "since", 7)
+
+    def queryset(self, params):
+        return Order.objects.filter(order_date__gte=parse_datetime(params["since"]))
+
+    def process(self, queryset, params, run):
+        logger = get_job_logger("order_reminders", REMINDERS_LOG)
+        reminded = 0
+        for order_id, email in queryset.order_by("pk").values_list("pk", "customer__email"):
+            logger.info(f"Reminder for order {order_id} -> {email}", extra={"fields": {"order": order_id, "email": email}})
+            reminded += 1
+        return {"reminded": reminded}
+
+
+@register
+class InactiveCustomersJob(ChunkedJob):
+    """Delete customers without an order since ``cutoff`` (default: 365 days)."""
+
+    name = "inactive_customers"
+    queue = QUEUE_LOW
+
+    def prepare(self, params):
+        return _since(params, "cutoff", 365)
+
+    def queryset(self, params):
+        return inactive_customers(parse_datetime(params["cutoff"]))
+
+    def process(self, queryset, params, run):
+        _, deleted = queryset.delete()
+        return {"deleted": deleted.get(Customer._meta.label, 0)}
+
+
+@register
+class OrderTotalsJob(ChunkedJob):
+    """Recalculate ``Order.total_amount`` from the linked products."""
+
+    name = "order_totals"
+    queue = QUEUE_LOW
+    chunk_size = 2000
+
+    def queryset(self, params):
+        return Order.objects.all()
+
+    def process(self, queryset, params, run):
+        return {"updated": queryset.recalculate_totals()}
+
+
+@register
+class CustomerActivityJob(ChunkedJob):
+    """Repair the denormalized customer activity columns (see crm.activity)."""
+
+    name = "customer_activity"
+    queue = QUEUE_LOW
+
+    def queryset(self, params):
+        return Customer.objects.all()
+
+    def process(self, queryset, params, run):
+        customers = list(queryset.only("pk", *ACTIVITY_FIELDS))
+        return {"checked": len(customers), "drifted": reconcile_customers(customers)}
+
+
+def pk_ranges(queryset, chunk_size: int) -> list[tuple[int, int]]:
+    """Inclusive ``(lo, hi)`` primary-key ranges spanning ``chunk_size`` keys each.
+
+    Only the lowest and highest key are read, so planning costs one query
+    however large the queryset is; ranges over gaps in the keys hold fewer
+    rows, or none.
+    """
+    bounds = queryset.order_by().aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return []
+    return [(lo, min(lo + chunk_size - 1, bounds["hi"])) for lo in range(bounds["lo"], bounds["hi"] + 1, chunk_size)]
+
+
+def plan_chunks(name: str, run_key: str, params: dict, chunk_size: int | None = None) -> tuple[list, dict]:
+    """``(ranges, params)`` for a run; a run dispatched again keeps its first plan.
+
+    ``params`` are prepared (``ChunkedJob.prepare``) and stored with the
+    chunks only when the run is first planned.
+    """
+    existing = JobChunk.objects.filter(job=name, run_key=run_key).order_by("lo")
+    if not existing.exists():
+        job = get_job(name)
+        params = job.prepare(params)
+        ranges = pk_ranges(job.queryset(params), chunk_size or job.chunk_size)
+        JobChunk.objects.bulk_create(
+            [JobChunk(job=name, run_key=run_key, lo=lo, hi=hi, params=params) for lo, hi in ranges],
+            ignore_conflicts=True,
+        )
+        if not ranges:
+            return [], params
+    # Read the plan back: a concurrent dispatch of the same run may have won.
+    chunks = list(existing.values_list("lo", "hi", "params"))
+    return [(lo, hi) for lo, hi, _ in chunks], chunks[0][2]
+
+
+def _rows(result: dict) -> int:
+    return sum(value for value in result.values() if isinstance(value, int))
+
+
+def run_chunk(name: str, run_key: str, lo: int, hi: int, params: dict) -> dict:
+    job = get_job(name)
+    chunk, _ = JobChunk.objects.get_or_create(job=name, run_key=run_key, lo=lo, defaults={"hi": hi, "params": params})
+    now = timezone.now()
+    claimable = Q(status__in=[JobChunk.PENDING, JobChunk.FAILED]) | Q(
+        status=JobChunk.RUNNING, started_at__lt=now - STALE_AFTER
+    )
+    claimed = JobChunk.objects.filter(claimable, pk=chunk.pk).update(
+        status=JobChunk.RUNNING, attempts=F("attempts") + 1, started_at=now
+    )
+    if not claimed:
+        chunk.refresh_from_db(fields=["status", "result"])
+        if chunk.status == JobChunk.DONE:
+            return chunk.result
+        raise ChunkBusy(f"{name}:{run_key} chunk [{lo}, {hi}] is running elsewhere")
+
+    logger = get_job_logger("crm_jobs", JOBS_LOG)
+    with job_run(logger, job=name, run_key=run_key, lo=lo, hi=hi) as run:
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                result = job.process(job.queryset(params).filter(pk__gte=lo, pk__lte=hi), params, run)
+                duration_ms = round((time.perf_counter() - started) * 1000, 3)
+                still_ours = JobChunk.objects.filter(pk=chunk.pk, status=JobChunk.RUNNING, started_at=now).update(
+                    status=JobChunk.DONE, result=result, duration_ms=duration_ms, finished_at=timezone.now()
+                )
+                if not still_ours:
+                    # Roll the chunk's writes back; the new claimant applies them.
+                    raise ChunkLost(f"{name}:{run_key} chunk [{lo}, {hi}] was reclaimed")
+        except ChunkLost:
+            raise
+        except Exception:
+            JobChunk.objects.filter(pk=chunk.pk, status=JobChunk.RUNNING, started_at=now).update(
+                status=JobChunk.FAILED, finished_at=timezone.now()
+            )
+            raise
+        run.rows = _rows(result)
+    return result
+
+
+def finish(name: str, run_key: str, results: list[dict], params: dict) -> dict:
+    job = get_job(name)
+    durations = list(
+        JobChunk.objects.filter(job=name, run_key=run_key, status=JobChunk.DONE).values_list("duration_ms", flat=True)
+    )
+    summary = {
+        "job": name,
+        "run_key": run_key,
+        "chunks": len(results),
+        "result": job.combine(results, params),
+        "chunk_ms": {
+            "total": round(sum(durations), 3),
+            "max": max(durations, default=0),
+            "avg": round(sum(durations) / len(durations), 3) if durations else 0,
+        },
+    }
+    logger = get_job_logger("crm_jobs", JOBS_LOG)
+    with job_run(logger, job=name, run_key=run_key) as run:
+        run.rows = _rows(summary["result"])
+        run.info(f"{name} finished", chunks=summary["chunks"], result=summary["result"], chunk_ms=summary["chunk_ms"])
+    return summary
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.archive import archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move orders older than CRM_ORDER_ARCHIVE_DAYS (or --days) to the archive tables in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Archive orders older than this many days")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after N batches (resume next run)")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options["days"] is not None and options["days"] < 0:
+            raise CommandError("--days cannot be negative")
+        cutoff = archive_cutoff(days=options["days"])
+        moved = archive_orders(
+            cutoff, batch_size=options["batch_size"], max_batches=options["max_batches"], pause=options["pause"]
+        )
+        self.stdout.write(f"Archived {moved} orders dated before {cutoff:%Y-%m-%d %H:%M}")
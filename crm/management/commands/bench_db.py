@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.db import apply_sqlite_pragmas, get_sqlite_pragmas
+
+
+BASELINE_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL"}
+SCRATCH_TABLE = "crm_bench_scratch"
+READ_SQL = (
+    "SELECT o.customer_id, COUNT(*), SUM(o.total_amount) "
+    "FROM crm_order o JOIN crm_order_products op ON op.order_id = o.id "
+    "GROUP BY o.customer_id"
+)
+
+
+class Command(BaseCommand):
+    help = "Concurrent read/write benchmark for the SQLite database, with and without the CRM pragmas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", help="Path to the SQLite file (defaults to the configured one)")
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--compare", action="store_true", help="Also run a rollback-journal baseline")
+
+    def handle(self, *args, **options):
+        db_settings = settings.DATABASES["default"]
+        if db_settings["ENGINE"] != "django.db.backends.sqlite3" and not options["database"]:
+            raise CommandError("bench_db only supports SQLite databases")
+        path = options["database"] or str(db_settings["NAME"])
+
+        self._setup(path)
+        try:
+            if options["compare"]:
+                self._report("baseline", self._run(path, BASELINE_PRAGMAS, options))
+            self._report("tuned", self._run(path, get_sqlite_pragmas(), options))
+        finally:
+            self._teardown(path)
+
+    def _connect(self, path: str, pragmas: dict) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        apply_sqlite_pragmas(conn.cursor(), pragmas)
+        return conn
+
+    def _setup(self, path: str) -> None:
+        conn = sqlite3.connect(path)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {SCRATCH_TABLE} (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.commit()
+        conn.close()
+
+    def _teardown(self, path: str) -> None:
+        conn = sqlite3.connect(path)
+        conn.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        conn.commit()
+        conn.close()
+
+    def _run(self, path: str, pragmas: dict, options) -> dict:
+        # journal_mode is persistent, so switch it once before starting threads.
+        self._connect(path, pragmas).close()
+
+        stats = {"reads": 0, "writes": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["seconds"]
+
+        def reader():
+            conn = self._connect(path, pragmas)
+            done = locked = 0
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute(READ_SQL).fetchall()
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                stats["reads"] += done
+                stats["locked"] += locked
+
+        def writer():
+            conn = self._connect(path, pragmas)
+            done = locked = 0
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(f"INSERT INTO {SCRATCH_TABLE} (payload) VALUES (?)", ("x" * 64,))
+                    conn.execute("COMMIT")
+                    done += 1
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    locked += 1
+            conn.close()
+            with lock:
+                stats["writes"] += done
+                stats["locked"] += locked
+
+        threads = [threading.Thread(target=reader) for _ in range(options["readers"])]
+        threads += [threading.Thread(target=writer) for _ in range(options["writers"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats["seconds"] = options["seconds"]
+        return stats
+
+    def _report(self, label: str, stats: dict) -> None:
+        seconds = stats["seconds"] or 1
+        self.stdout.write(
+            f"{label:>8}: {stats['reads'] / seconds:10.1f} reads/s  "
+            f"{stats['writes'] / seconds:10.1f} writes/s  "
+            f"{stats['locked']} locked errors"
+        )
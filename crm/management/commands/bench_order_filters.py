@@ -0,0 +1,102 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from crm.filters import OrderFilter
+from crm.models import Customer, Order, Product
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large throwaway dataset inside a transaction, check that the OrderFilter "
+        "product filters compile without DISTINCT and time them against JOIN + DISTINCT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=2000)
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--per-order", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options)
+                self._compare(options)
+                # Never keep the benchmark data.
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, options) -> None:
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+        customers = Customer.objects.bulk_create(
+            Customer(name=f"Bench {i}", email=f"bench-{i}@bench.invalid") for i in range(options["customers"])
+        )
+        products = Product.objects.bulk_create(
+            Product(name=f"Bench product {i}", price=Decimal("9.99"), stock=100) for i in range(options["products"])
+        )
+        orders = Order.objects.bulk_create(
+            (Order(customer=rng.choice(customers)) for _ in range(options["orders"])), batch_size=5000
+        )
+        through = Order.products.through
+        per_order = min(options["per_order"], len(products))
+        through.objects.bulk_create(
+            (
+                through(order_id=order.pk, product_id=product.pk)
+                for order in orders
+                for product in rng.sample(products, per_order)
+            ),
+            batch_size=10000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(
+            f"Seeded {len(orders)} orders x {per_order} products in {time.perf_counter() - started:.1f}s"
+        )
+        self.product = products[len(products) // 2]
+
+    def _compare(self, options) -> None:
+        cases = [
+            ("product_id", {"product_id": self.product.pk}, {"products__id": self.product.pk}),
+            ("product_name", {"product_name": "product 1"}, {"products__name__icontains": "product 1"}),
+        ]
+        for label, filter_data, join_lookup in cases:
+            semi_qs = OrderFilter(data=filter_data, queryset=Order.objects.all()).qs.order_by("-id")
+            join_qs = Order.objects.filter(**join_lookup).distinct().order_by("-id")
+
+            sql = str(semi_qs.query)
+            if "DISTINCT" in sql.upper():
+                raise CommandError(f"{label}: generated SQL still uses DISTINCT:\n{sql}")
+
+            semi_count, semi_page, semi_total = self._time(semi_qs, options["repeat"])
+            join_count, join_page, join_total = self._time(join_qs, options["repeat"])
+            if semi_count != join_count:
+                raise CommandError(f"{label}: semi-join matched {semi_count} orders, JOIN matched {join_count}")
+
+            self.stdout.write(
+                f"{label:>13}: {semi_count} orders | first page {semi_page * 1000:.1f}ms vs "
+                f"{join_page * 1000:.1f}ms JOIN+DISTINCT | count {semi_total * 1000:.1f}ms vs {join_total * 1000:.1f}ms"
+            )
+
+    def _time(self, queryset, repeat: int):
+        count = queryset.count()
+        best_page = best_count = float("inf")
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            list(queryset.values_list("id", flat=True)[:50])
+            best_page = min(best_page, time.perf_counter() - started)
+            started = time.perf_counter()
+            queryset.count()
+            best_count = min(best_count, time.perf_counter() - started)
+        return count, best_page, best_count
@@ -0,0 +1,106 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SETUP = (
+    "import os, time; t0 = time.perf_counter(); "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_backend_graphql_crm.settings'); "
+)
+
+# Each scenario prints {"startup_ms": ..., "first_request_ms": ...} on stdout.
+SCENARIOS = {
+    "web": SETUP
+    + "from alx_backend_graphql_crm.wsgi import application; t1 = time.perf_counter(); "
+    "import io, json; from wsgiref.util import setup_testing_defaults; "
+    "body = json.dumps({'query': '{ hello }'}).encode(); "
+    "env = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/graphql', 'CONTENT_TYPE': 'application/json', "
+    "'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body)}; setup_testing_defaults(env); "
+    "b''.join(application(env, lambda *a: None)); t2 = time.perf_counter(); "
+    "print(json.dumps({'startup_ms': (t1 - t0) * 1000, 'first_request_ms': (t2 - t0) * 1000}))",
+    "cron": SETUP
+    + "import django, json; django.setup(); import crm.cron; t1 = time.perf_counter(); "
+    "print(json.dumps({'startup_ms': (t1 - t0) * 1000}))",
+    "worker": SETUP
+    + "import json; from crm.celery import app; app.loader.import_default_modules(); t1 = time.perf_counter(); "
+    "print(json.dumps({'startup_ms': (t1 - t0) * 1000}))",
+}
+
+# Top-level packages a scenario must not import.
+FORBIDDEN = {
+    "web": ("celery", "kombu", "gql", "requests", "numpy"),
+    "cron": ("celery", "kombu", "gql"),
+    "worker": (),
+}
+
+
+def _parse_importtime(stderr: str) -> tuple[dict[str, int], set[str]]:
+    """Return cumulative microseconds per top-level import and every package seen."""
+    totals = {}
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith(" "):
+            top = name.split(".")[0]
+            totals[top] = totals.get(top, 0) + int(parts[1])
+    return totals, packages
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start of the web, cron and worker processes (python -X importtime plus "
+        "time to the first GraphQL request) and fail if a budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+        parser.add_argument("--runs", type=int, default=3, help="Best of N runs")
+        parser.add_argument("--budget-ms", type=float, default=None, help="Max web time to first request")
+        parser.add_argument("--cron-budget-ms", type=float, default=None, help="Max cron startup time")
+        parser.add_argument("--top", type=int, default=8, help="Show the N slowest top-level imports")
+
+    def handle(self, *args, **options):
+        failures = []
+        for name in options["scenario"] or ["web", "cron"]:
+            timings, imports, packages = self._measure(name, options["runs"])
+            summary = ", ".join(f"{key} {value:.0f}ms" for key, value in timings.items())
+            self.stdout.write(f"{name}: {summary}")
+            for module, micros in sorted(imports.items(), key=lambda item: -item[1])[: options["top"]]:
+                self.stdout.write(f"    {micros / 1000:8.1f}ms  {module}")
+
+            loaded = [pkg for pkg in FORBIDDEN[name] if pkg in packages]
+            if loaded:
+                failures.append(f"{name} imports {', '.join(loaded)}")
+            if name == "web" and options["budget_ms"] and timings["first_request_ms"] > options["budget_ms"]:
+                failures.append(f"web first request {timings['first_request_ms']:.0f}ms > {options['budget_ms']:.0f}ms")
+            if name == "cron" and options["cron_budget_ms"] and timings["startup_ms"] > options["cron_budget_ms"]:
+                failures.append(f"cron startup {timings['startup_ms']:.0f}ms > {options['cron_budget_ms']:.0f}ms")
+
+        if failures:
+            raise CommandError("; ".join(failures))
+
+    def _run(self, code: str, importtime: bool) -> subprocess.CompletedProcess:
+        command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+        result = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else "startup failed")
+        return result
+
+    def _measure(self, name: str, runs: int):
+        code = SCENARIOS[name]
+        best = {}
+        for _ in range(max(1, runs)):
+            timings = json.loads(self._run(code, importtime=False).stdout.strip().splitlines()[-1])
+            for key, value in timings.items():
+                best[key] = min(best.get(key, value), value)
+        imports, packages = _parse_importtime(self._run(code, importtime=True).stderr)
+        return best, imports, packages
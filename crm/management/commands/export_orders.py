@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.export import DEFAULT_CHUNK_SIZE, RENDERERS, ExportError, export_orders
+
+
+class Command(BaseCommand):
+    help = "Stream all orders (optionally filtered) to a file or stdout as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(RENDERERS), default="ndjson")
+        parser.add_argument("--output", help="File to write to (defaults to stdout)")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="NAME=VALUE",
+            help="OrderFilter argument, e.g. order_date_gte=2024-01-01T00:00:00Z (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        filter_data = {}
+        for item in options["filter"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Invalid filter '{item}', expected NAME=VALUE")
+            filter_data[name] = value
+
+        try:
+            stream = export_orders(
+                filter_data,
+                fmt=options["format"],
+                chunk_size=options["chunk_size"],
+                gzip=options["gzip"],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if options["output"]:
+            mode = "wb" if options["gzip"] else "w"
+            encoding = None if options["gzip"] else "utf-8"
+            with open(options["output"], mode, encoding=encoding, newline="" if encoding else None) as f:
+                for chunk in stream:
+                    f.write(chunk)
+        elif options["gzip"]:
+            for chunk in stream:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in stream:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from crm.activity import reconcile_customer_activity
+
+
+class Command(BaseCommand):
+    help = "Recompute Customer.order_count/lifetime_value/last_order_date in batches and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report drifted customers")
+
+    def handle(self, *args, **options):
+        result = reconcile_customer_activity(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        action = "found" if options["dry_run"] else "fixed"
+        self.stdout.write(f"Checked {result['checked']} customers, {action} {result['drifted']} with drift")
@@ -0,0 +1,56 @@
+import json
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.jobs import JOBS
+from crm.models import JobChunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a chunked CRM job (crm.jobs) on Celery, or run it in this process with --eager "
+        "(eager mode, in-memory broker and result backend)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("job", choices=sorted(JOBS))
+        parser.add_argument("--run-key", help="Idempotency key; reusing it resumes the run (default: new)")
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                            help="Job parameter, e.g. days=30 (repeatable)")
+        parser.add_argument("--eager", action="store_true", help="Run every chunk here instead of on workers")
+
+    def handle(self, *args, **options):
+        from crm.celery import app
+        from crm.tasks import dispatch_job, start_job
+
+        params = {}
+        for item in options["param"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Invalid parameter '{item}', expected NAME=VALUE")
+            params[name] = int(value) if value.isdigit() else value
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        if not options["eager"]:
+            result = start_job.delay(options["job"], run_key=options["run_key"], params=params,
+                                     chunk_size=options["chunk_size"])
+            self.stdout.write(f"Started {options['job']} (task {result.id})")
+            return
+
+        app.conf.update(
+            task_always_eager=True,
+            task_eager_propagates=True,
+            broker_url="memory://",
+            result_backend="cache+memory://",
+        )
+        run_key = options["run_key"] or uuid.uuid4().hex
+        summary = dispatch_job(options["job"], run_key, params=params, chunk_size=options["chunk_size"]).get()
+        for chunk in JobChunk.objects.filter(job=options["job"], run_key=run_key).order_by("lo"):
+            self.stdout.write(
+                f"  [{chunk.lo}, {chunk.hi}] {chunk.status} attempts={chunk.attempts} "
+                f"{chunk.duration_ms or 0:.1f}ms {json.dumps(chunk.result)}"
+            )
+        self.stdout.write(json.dumps(summary))
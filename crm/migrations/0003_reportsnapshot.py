@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:12
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_customer_created_at_order_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField(db_index=True)),
+                ('new_customers', models.PositiveIntegerField(default=0)),
+                ('new_orders', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('total_customers', models.PositiveIntegerField(default=0)),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('last_order_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('last_customer_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_customer_id', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-period_end', '-id'],
+                'get_latest_by': ['period_end', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at', 'id'], name='crm_customer_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='crm_order_created_id_idx'),
+        ),
+    ]
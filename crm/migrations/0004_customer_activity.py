@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:15
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_customer_activity(apps, schema_editor):
+    Customer = apps.get_model('crm', 'Customer')
+    Order = apps.get_model('crm', 'Order')
+    per_customer = Order.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    Customer.objects.update(
+        order_count=Coalesce(Subquery(per_customer.annotate(n=Count('id')).values('n')), Value(0)),
+        lifetime_value=Coalesce(
+            Subquery(per_customer.annotate(total=Sum('total_amount')).values('total')),
+            Value(Decimal('0.00')),
+            output_field=models.DecimalField(max_digits=16, decimal_places=2),
+        ),
+        last_order_date=Subquery(per_customer.annotate(last=Max('order_date')).values('last')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_reportsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_order_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_value',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_customer_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=64)),
+                ('run_key', models.CharField(max_length=64)),
+                ('lo', models.BigIntegerField()),
+                ('hi', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('duration_ms', models.FloatField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='jobchunk',
+            constraint=models.UniqueConstraint(fields=('job', 'run_key', 'lo'), name='crm_jobchunk_key_uniq'),
+        ),
+    ]
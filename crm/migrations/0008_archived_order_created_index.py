@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_job_chunks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at', 'id'], name='crm_archorder_created_id_idx'),
+        ),
+    ]
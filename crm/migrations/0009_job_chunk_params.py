@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0008_archived_order_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobchunk',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
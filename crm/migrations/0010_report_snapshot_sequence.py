@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:02
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def number_snapshots(apps, schema_editor):
+    ReportSnapshot = apps.get_model('crm', 'ReportSnapshot')
+    snapshots = list(ReportSnapshot.objects.order_by('period_end', 'id').only('pk'))
+    for sequence, snapshot in enumerate(snapshots, start=1):
+        snapshot.sequence = sequence
+    ReportSnapshot.objects.bulk_update(snapshots, ['sequence'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_job_chunk_params'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportsnapshot',
+            name='sequence',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(number_snapshots, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reportsnapshot',
+            name='sequence',
+            field=models.PositiveIntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='reportsnapshot',
+            name='total_customers',
+            field=models.PositiveIntegerField(default=0, help_text='Cumulative: customers created up to period_end; deleted customers still count'),
+        ),
+        migrations.AlterField(
+            model_name='reportsnapshot',
+            name='total_orders',
+            field=models.PositiveIntegerField(default=0, help_text='Cumulative: orders created up to period_end, archived included; deletions still count'),
+        ),
+        migrations.AlterField(
+            model_name='reportsnapshot',
+            name='total_revenue',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Cumulative revenue of total_orders', max_digits=18),
+        ),
+    ]
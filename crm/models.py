@@ -1,6 +1,7 @@
 from decimal import Decimal
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -9,6 +10,18 @@ class Customer(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=32, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized from orders on write (crm.activity); reconcile_customer_activity repairs drift.
+    order_count = models.PositiveIntegerField(default=0, db_index=True)
+    lifetime_value = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"), db_index=True)
+    last_order_date = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="crm_customer_created_id_idx"),
+            # Prefix search in the admin (crm.admin.PrefixSearchMixin).
+            models.Index(fields=["name"], name="crm_customer_name_idx"),
+            models.Index(fields=["phone"], name="crm_customer_phone_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} <{self.email}>"
@@ -20,10 +33,32 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["name"], name="crm_product_name_idx")]
+
     def __str__(self):
         return f"{self.name} ({self.price})"
 
 
+class OrderQuerySet(models.QuerySet):
+    def recalculate_totals(self) -> int:
+        """Set ``total_amount`` to the sum of product prices in one UPDATE."""
+        item_totals = (
+            self.model.products.through.objects.filter(order_id=models.OuterRef("pk"))
+            .order_by()
+            .values("order_id")
+            .annotate(total=models.Sum("product__price"))
+            .values("total")
+        )
+        return self.update(
+            total_amount=Coalesce(
+                models.Subquery(item_totals),
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            )
+        )
+
+
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="orders")
     products = models.ManyToManyField(Product, related_name="orders")
@@ -31,6 +66,15 @@ class Order(models.Model):
     order_date = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="crm_order_created_id_idx"),
+            # orderDateGte/Lte filters and archival (crm.archive) scan by order_date.
+            models.Index(fields=["order_date", "id"], name="crm_order_date_id_idx"),
+        ]
+
     def recalculate_total(self) -> None:
         total = Decimal("0.00")
         for product in self.products.all():
@@ -40,3 +84,110 @@ class Order(models.Model):
 
     def __str__(self):
         return f"Order #{self.pk} - {self.customer} - {self.total_amount}"
+
+
+class ArchivedOrder(models.Model):
+    """An order moved out of ``Order`` by ``crm.archive``.
+
+    Keeps the original primary key (so global IDs stay valid) and the same
+    columns in the same order as ``Order``, which lets the two be UNIONed.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="archived_orders")
+    products = models.ManyToManyField(Product, through="ArchivedOrderProduct", related_name="archived_orders")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    order_date = models.DateTimeField()
+    created_at = models.DateTimeField()
+
+    is_archived = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_date", "id"], name="crm_archorder_date_id_idx"),
+            # Incremental report scans (crm.reports) read past a (created_at, id) mark.
+            models.Index(fields=["created_at", "id"], name="crm_archorder_created_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.pk} - {self.customer} - {self.total_amount}"
+
+
+class ArchivedOrderProduct(models.Model):
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["order", "product"], name="crm_archorder_product_uniq")]
+
+
+class ReportSnapshot(models.Model):
+    """One run of the CRM report: the period's deltas plus running totals.
+
+    ``(last_order_created_at, last_order_id)`` and the customer equivalents
+    are the high-water marks the next run starts from. ``sequence`` is the
+    previous snapshot's plus one and unique, so two concurrent runs can't
+    both extend the same snapshot.
+    """
+
+    sequence = models.PositiveIntegerField(unique=True)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField(db_index=True)
+    new_customers = models.PositiveIntegerField(default=0)
+    new_orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    total_customers = models.PositiveIntegerField(
+        default=0, help_text="Cumulative: customers created up to period_end; deleted customers still count"
+    )
+    total_orders = models.PositiveIntegerField(
+        default=0, help_text="Cumulative: orders created up to period_end, archived included; deletions still count"
+    )
+    total_revenue = models.DecimalField(
+        max_digits=18, decimal_places=2, default=Decimal("0.00"), help_text="Cumulative revenue of total_orders"
+    )
+    last_order_created_at = models.DateTimeField(null=True, blank=True)
+    last_order_id = models.BigIntegerField(default=0)
+    last_customer_created_at = models.DateTimeField(null=True, blank=True)
+    last_customer_id = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-period_end", "-id"]
+        get_latest_by = ["period_end", "id"]
+
+    def __str__(self):
+        return f"Report {self.period_start:%Y-%m-%d} - {self.period_end:%Y-%m-%d}"
+
+
+class JobChunk(models.Model):
+    """One PK range of a chunked job run (crm.jobs).
+
+    ``(job, run_key, lo)`` is the idempotency key: a chunk that is ``done``
+    is never applied again, whichever worker or retry picks it up.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(s, s) for s in (PENDING, RUNNING, DONE, FAILED)]
+
+    job = models.CharField(max_length=64)
+    run_key = models.CharField(max_length=64)
+    lo = models.BigIntegerField()
+    hi = models.BigIntegerField()
+    # The run's prepared params, stored with the plan so a resumed run reuses them.
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["job", "run_key", "lo"], name="crm_jobchunk_key_uniq")]
+
+    def __str__(self):
+        return f"{self.job}:{self.run_key} [{self.lo}, {self.hi}] {self.status}"
@@ -0,0 +1,82 @@
+"""Batched relay node lookup for the root ``node``/``nodes`` fields.
+
+Global IDs are decoded and grouped by type; each type is fetched with one
+``pk__in`` query through ``get_nodes`` (see ``BatchNodeMixin``). Loaded nodes,
+misses included, are kept on the request (``info.context``) for the rest of
+the operation, so repeated IDs cost nothing. Every request carries a single
+operation (no batching), so a query never sees nodes cached before a write.
+"""
+from django.core.exceptions import ValidationError
+from graphene.relay import Node
+from graphene_django import DjangoObjectType
+from graphql_relay import from_global_id
+
+
+CACHE_ATTR = "_crm_node_cache"
+
+
+class BatchNodeMixin:
+    @classmethod
+    def get_nodes(cls, info, ids: list) -> dict:
+        """Return ``{pk: instance}`` for the given primary keys."""
+        queryset = cls.get_queryset(cls._meta.model.objects, info)
+        return {obj.pk: obj for obj in queryset.filter(pk__in=ids)}
+
+
+def request_cache(info) -> dict:
+    context = info.context
+    if context is None:
+        return {}
+    if isinstance(context, dict):
+        return context.setdefault(CACHE_ATTR, {})
+    cache = getattr(context, CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(context, CACHE_ATTR, cache)
+    return cache
+
+
+def _node_type(info, type_name: str):
+    graphql_type = info.schema.get_type(type_name)
+    graphene_type = getattr(graphql_type, "graphene_type", None)
+    if (
+        isinstance(graphene_type, type)
+        and issubclass(graphene_type, DjangoObjectType)
+        and issubclass(graphene_type, BatchNodeMixin)
+        and Node in graphene_type._meta.interfaces
+    ):
+        return graphene_type
+    return None
+
+
+def _decode(info, global_id: str):
+    """``(graphene_type, pk)`` for a global ID, or None if it can't name a node."""
+    try:
+        type_name, raw_pk = from_global_id(global_id)
+    except Exception:
+        return None
+    graphene_type = _node_type(info, type_name) if type_name else None
+    if graphene_type is None:
+        return None
+    try:
+        pk = graphene_type._meta.model._meta.pk.to_python(raw_pk)
+    except ValidationError:
+        return None
+    return graphene_type, pk
+
+
+def load_nodes(info, global_ids: list[str]) -> list:
+    """Nodes for ``global_ids`` in input order; None for unknown or missing IDs."""
+    cache = request_cache(info)
+    keys = [_decode(info, global_id) for global_id in global_ids]
+
+    wanted: dict = {}
+    for key in keys:
+        if key is not None and (key[0]._meta.name, key[1]) not in cache:
+            wanted.setdefault(key[0], set()).add(key[1])
+    for graphene_type, pks in wanted.items():
+        found = graphene_type.get_nodes(info, list(pks))
+        for pk in pks:
+            cache[(graphene_type._meta.name, pk)] = found.get(pk)
+
+    return [None if key is None else cache[(key[0]._meta.name, key[1])] for key in keys]
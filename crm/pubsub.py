@@ -0,0 +1,227 @@
+"""Publish/subscribe backends feeding the GraphQL subscriptions.
+
+Mutations publish plain JSON-compatible dicts from any thread; subscribers
+live on the ASGI event loop. Each subscriber has a bounded queue and an
+optional predicate that is checked at publish time, so events a client does
+not want are never queued for it, and a slow client only loses its own
+oldest events instead of holding up everyone else.
+
+``InMemoryPubSub`` only reaches subscribers in the same process. Set
+``CRM_PUBSUB_BACKEND = "redis"`` when mutations and websockets are served by
+different processes. The ASGI application calls ``close_pubsub`` on lifespan
+shutdown so no Redis listener outlives its event loop.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Callable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "crm.order_created"
+STOCK_CHANGED = "crm.stock_changed"
+DEFAULT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """Async iterator over the messages delivered to one subscriber."""
+
+    def __init__(self, channel: str, predicate: Callable[[dict], bool] | None = None, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.channel = channel
+        self.predicate = predicate
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def accepts(self, message: dict) -> bool:
+        if self.predicate is None:
+            return True
+        try:
+            return bool(self.predicate(message))
+        except Exception:
+            logger.exception("Subscription filter failed on %s", self.channel)
+            return False
+
+    def deliver(self, message: dict) -> None:
+        # Must run on self.loop. Drop the oldest event rather than block.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+
+class InMemoryPubSub:
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str, predicate: Callable[[dict], bool] | None = None) -> Subscription:
+        subscription = Subscription(channel, predicate, maxsize=self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions[subscription.channel].discard(subscription)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+    def publish(self, channel: str, message: dict) -> int:
+        """Queue ``message`` for every matching subscriber; returns how many."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        delivered = 0
+        for subscription in subscriptions:
+            if not subscription.accepts(message):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # The subscriber's event loop is gone.
+                self.unsubscribe(subscription)
+                continue
+            delivered += 1
+        return delivered
+
+    async def aclose(self) -> None:
+        """Nothing to release; subscribers end with their websockets."""
+
+
+class RedisPubSub:
+    """Redis transport with one listener per channel per event loop.
+
+    Messages received from Redis are fanned out to local subscribers through
+    an ``InMemoryPubSub``, so each process keeps a single Redis connection per
+    channel however many websocket clients it serves. A listener is cancelled
+    when its last local subscriber leaves, or by ``aclose``.
+    """
+
+    def __init__(self, url: str, queue_size: int = DEFAULT_QUEUE_SIZE):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+        self._local = InMemoryPubSub(queue_size=queue_size)
+        self._listeners: dict[tuple[int, str], asyncio.Task] = {}
+        self._subscribers: Counter[tuple[int, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str, predicate: Callable[[dict], bool] | None = None) -> Subscription:
+        subscription = self._local.subscribe(channel, predicate)
+        key = (id(subscription.loop), channel)
+        with self._lock:
+            self._subscribers[key] += 1
+            task = self._listeners.get(key)
+            if task is None or task.done():
+                self._listeners[key] = subscription.loop.create_task(self._listen(channel))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._local.unsubscribe(subscription)
+        key = (id(subscription.loop), subscription.channel)
+        with self._lock:
+            self._subscribers[key] -= 1
+            if self._subscribers[key] > 0:
+                return
+            del self._subscribers[key]
+            task = self._listeners.pop(key, None)
+        if task is not None:
+            try:
+                subscription.loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # The loop is closed; the task died with it.
+
+    async def aclose(self) -> None:
+        """Cancel and await the listeners running on the current event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            keys = [key for key in self._listeners if key[0] == loop_id]
+            tasks = [self._listeners.pop(key) for key in keys]
+            for key in keys:
+                self._subscribers.pop(key, None)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def subscriber_count(self, channel: str) -> int:
+        return self._local.subscriber_count(channel)
+
+    def publish(self, channel: str, message: dict) -> int:
+        return self._client.publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    async def _listen(self, channel: str) -> None:
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for raw in pubsub.listen():
+                if raw.get("type") != "message":
+                    continue
+                try:
+                    message = json.loads(raw["data"])
+                except (TypeError, ValueError):
+                    logger.warning("Ignoring malformed message on %s", channel)
+                    continue
+                self._local.publish(channel, message)
+        finally:
+            await pubsub.unsubscribe(channel)
+            # redis-py < 5 only has close().
+            await getattr(client, "aclose", client.close)()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_pubsub():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                queue_size = getattr(settings, "CRM_PUBSUB_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)
+                if getattr(settings, "CRM_PUBSUB_BACKEND", "memory") == "redis":
+                    _backend = RedisPubSub(settings.CRM_PUBSUB_REDIS_URL, queue_size=queue_size)
+                else:
+                    _backend = InMemoryPubSub(queue_size=queue_size)
+    return _backend
+
+
+def set_pubsub(backend) -> None:
+    """Swap the process-wide backend (e.g. a fresh ``InMemoryPubSub`` in tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+async def close_pubsub() -> None:
+    """Stop the backend's listeners on this event loop (ASGI lifespan shutdown)."""
+    backend = _backend
+    if backend is not None:
+        await backend.aclose()
+
+
+def publish(channel: str, message: dict) -> int:
+    """Publish without ever failing the caller (mutations call this)."""
+    try:
+        return get_pubsub().publish(channel, message)
+    except Exception:
+        logger.exception("Failed to publish to %s", channel)
+        return 0
@@ -1,4 +1,5 @@
 import re
+from datetime import datetime
 from decimal import Decimal
 from typing import List, Tuple
 
@@ -7,38 +8,166 @@ from django.db import IntegrityError, transaction
 from django.utils import timezone
 from graphene_django import DjangoObjectType
 from graphene_django.filter import DjangoFilterConnectionField
+from graphql import GraphQLError
+from graphql_relay import from_global_id, to_global_id
 
-from .models import Customer, Product, Order
+from .models import ArchivedOrder, Customer, Product, Order, ReportSnapshot
 from crm.models import Product
-from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .filters import ArchivedOrderFilter, CustomerFilter, ProductFilter, OrderFilter
+from .activity import record_order
+from . import analytics
+from .archive import archive_reaches, with_archive
+from .counts import estimate_count, invalidate_total
+from .nodes import BatchNodeMixin, load_nodes
+from .pubsub import ORDER_CREATED, STOCK_CHANGED, get_pubsub, publish
+from .reports import snapshots_between
 
 
 PHONE_REGEX = re.compile(r"^(\+?\d{7,15}|\d{3}-\d{3}-\d{4})$")
 
 
-class CustomerType(DjangoObjectType):
+class CountableConnection(graphene.relay.Connection):
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int(description="Exact count")
+    total_count_estimate = graphene.Int(description="Planner estimate; cheap on large tables")
+
+    def resolve_total_count(root, info):
+        # The exact count graphene-django already ran to slice the page.
+        return root.length
+
+    def resolve_total_count_estimate(root, info):
+        return estimate_count(root.iterable)
+
+
+class CustomerType(BatchNodeMixin, DjangoObjectType):
     class Meta:
         model = Customer
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
         filterset_class = CustomerFilter
-        fields = ("id", "name", "email", "phone", "created_at")
+        fields = ("id", "name", "email", "phone", "created_at", "order_count", "lifetime_value", "last_order_date")
 
 
-class ProductType(DjangoObjectType):
+class ProductType(BatchNodeMixin, DjangoObjectType):
     class Meta:
         model = Product
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
         filterset_class = ProductFilter
         fields = ("id", "name", "price", "stock", "created_at")
 
 
-class OrderType(DjangoObjectType):
+class OrderType(BatchNodeMixin, DjangoObjectType):
     class Meta:
         model = Order
         interfaces = (graphene.relay.Node,)
+        connection_class = CountableConnection
         filterset_class = OrderFilter
         fields = ("id", "customer", "products", "total_amount", "order_date", "created_at")
 
+    @classmethod
+    def is_type_of(cls, root, info):
+        return isinstance(root, ArchivedOrder) or super().is_type_of(root, info)
+
+    @classmethod
+    def get_node(cls, info, id):
+        order = super().get_node(info, id)
+        if order is None:
+            # Archived orders keep their primary key, hence their global ID.
+            order = ArchivedOrder.objects.filter(pk=id).first()
+        return order
+
+    @classmethod
+    def get_nodes(cls, info, ids):
+        found = super().get_nodes(info, ids)
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            found.update((order.pk, order) for order in ArchivedOrder.objects.filter(pk__in=missing))
+        return found
+
+    def resolve_products(root, info, **kwargs):
+        if getattr(root, "is_archived", False):
+            return Product.objects.filter(archived_orders=root.pk)
+        return root.products.all()
+
+
+class OrderConnectionField(DjangoFilterConnectionField):
+    """Reads the hot ``Order`` table, plus the archive when ``orderDateGte`` reaches into it."""
+
+    @classmethod
+    def resolve_queryset(cls, connection, iterable, info, args, filtering_args, filterset_class):
+        hot = super().resolve_queryset(connection, iterable, info, args, filtering_args, filterset_class)
+        if not archive_reaches(args.get("order_date_gte")):
+            return hot
+        archived = super().resolve_queryset(
+            connection, ArchivedOrder.objects.all(), info, args, filtering_args, ArchivedOrderFilter
+        )
+        return with_archive(hot, archived)
+
+
+class ReportSnapshotType(DjangoObjectType):
+    class Meta:
+        model = ReportSnapshot
+        fields = (
+            "id",
+            "period_start",
+            "period_end",
+            "new_customers",
+            "new_orders",
+            "revenue",
+            "total_customers",
+            "total_orders",
+            "total_revenue",
+            "created_at",
+        )
+
+
+class ProductAffinityType(graphene.ObjectType):
+    product = graphene.Field(ProductType)
+    orders = graphene.Int(description="Orders containing both products")
+    confidence = graphene.Float(description="Share of the given product's orders that also contain this one")
+    lift = graphene.Float(description="Confidence relative to this product's overall order share; >1 means affinity")
+
+
+class ProductPairType(graphene.ObjectType):
+    products = graphene.List(ProductType)
+    orders = graphene.Int()
+
+
+class PriceBucketType(graphene.ObjectType):
+    low = graphene.Float()
+    high = graphene.Float()
+    items = graphene.Int()
+    revenue = graphene.Float()
+
+
+class RfmSegmentType(graphene.ObjectType):
+    segment = graphene.String()
+    customers = graphene.Int()
+    revenue = graphene.Float()
+
+
+def _with_products(rows: list[dict], key: str, many: bool = False) -> list[dict]:
+    """Replace product ids in analytics rows with ``Product`` instances (one query)."""
+    ids = {pk for row in rows for pk in (row[key] if many else [row[key]])}
+    products = Product.objects.in_bulk(ids)
+    for row in rows:
+        ids = row.pop(key)
+        if many:
+            row["products"] = [products.get(pk) for pk in ids]
+        else:
+            row["product"] = products.get(ids)
+    return rows
+
+
+def _analytics(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except analytics.AnalyticsError as e:
+        raise GraphQLError(str(e))
+
 
 class CreateCustomerInput(graphene.InputObjectType):
     name = graphene.String(required=True)
@@ -110,6 +239,8 @@ class BulkCreateCustomers(graphene.Mutation):
             try:
                 with transaction.atomic():
                     created = Customer.objects.bulk_create(valid_instances, ignore_conflicts=True)
+                # bulk_create sends no post_save signals.
+                invalidate_total(Customer)
             except Exception as e:
                 errors.append(str(e))
 
@@ -182,6 +313,8 @@ class CreateOrder(graphene.Mutation):
             order.products.add(*products)
             order.recalculate_total()
             order.save()
+            record_order(order)
+            transaction.on_commit(lambda: publish(ORDER_CREATED, order_created_event(order, customer, products)))
 
         return CreateOrder(order=order, ok=True, message="Order created")
 
@@ -200,23 +333,88 @@ def _apply_ordering(queryset, order_by_list: list[str], allowed: set[str]):
 class Query(graphene.ObjectType):
     hello = graphene.String(default_value="Hello, GraphQL!")
 
+    node = graphene.Field(graphene.relay.Node, id=graphene.ID(required=True), description="Fetch any node by global ID")
+    nodes = graphene.Field(
+        graphene.NonNull(graphene.List(graphene.relay.Node)),
+        ids=graphene.List(graphene.NonNull(graphene.ID), required=True),
+        description="Fetch nodes by global ID, one query per type; null for unknown IDs, in input order",
+    )
+
+    # order_by goes through args: DjangoFilterConnectionField would take an
+    # order_by keyword as its own (unused) parameter and drop the argument.
     all_customers = DjangoFilterConnectionField(
         CustomerType,
-        order_by=graphene.List(graphene.String, description="Fields to order by, e.g., name or -created_at"),
+        args={"order_by": graphene.List(graphene.String, description="Fields to order by, e.g., name or -created_at")},
     )
     all_products = DjangoFilterConnectionField(
         ProductType,
-        order_by=graphene.List(graphene.String, description="Fields to order by, e.g., price or -stock"),
+        args={"order_by": graphene.List(graphene.String, description="Fields to order by, e.g., price or -stock")},
     )
-    all_orders = DjangoFilterConnectionField(
+    all_orders = OrderConnectionField(
         OrderType,
-        order_by=graphene.List(graphene.String, description="Fields to order by, e.g., -order_date or total_amount"),
+        args={"order_by": graphene.List(graphene.String, description="Fields to order by, e.g., -order_date or total_amount")},
     )
 
+    product_affinity = graphene.List(
+        graphene.NonNull(ProductAffinityType),
+        product_id=graphene.ID(required=True),
+        top=graphene.Int(default_value=10),
+        description="Products most often bought together with the given one",
+    )
+    product_pairs = graphene.List(
+        graphene.NonNull(ProductPairType),
+        top=graphene.Int(default_value=10),
+        description="Product pairs found in the most orders",
+    )
+    revenue_by_price_bucket = graphene.List(
+        graphene.NonNull(PriceBucketType),
+        bins=graphene.Int(default_value=10),
+        edges=graphene.List(graphene.NonNull(graphene.Float), description="Bucket edges; overrides bins"),
+    )
+    rfm_segments = graphene.List(graphene.NonNull(RfmSegmentType), description="Customers by recency/frequency segment")
+
+    reports = graphene.List(
+        graphene.NonNull(ReportSnapshotType),
+        from_=graphene.DateTime(name="from"),
+        to=graphene.DateTime(),
+        description="Stored CRM report snapshots overlapping the given range, newest first",
+    )
+
+    def resolve_node(self, info, id):
+        return load_nodes(info, [id])[0]
+
+    def resolve_nodes(self, info, ids):
+        return load_nodes(info, ids)
+
+    def resolve_product_affinity(self, info, product_id, top=10):
+        try:
+            type_name, pk = from_global_id(product_id)
+        except Exception:
+            type_name, pk = None, None
+        if product_id.isdigit():
+            pk = product_id
+        elif type_name != ProductType._meta.name or not pk or not pk.isdigit():
+            raise GraphQLError("Invalid product ID")
+        return _with_products(_analytics(analytics.product_affinity, int(pk), top=max(top, 0)), "product_id")
+
+    def resolve_product_pairs(self, info, top=10):
+        return _with_products(_analytics(analytics.top_product_pairs, top=max(top, 0)), "product_ids", many=True)
+
+    def resolve_revenue_by_price_bucket(self, info, bins=10, edges=None):
+        return _analytics(analytics.revenue_by_price_bucket, bins=bins, edges=edges)
+
+    def resolve_rfm_segments(self, info):
+        return _analytics(analytics.rfm_segments)
+
+    def resolve_reports(self, info, from_=None, to=None):
+        return snapshots_between(from_, to)
+
     def resolve_all_customers(self, info, **kwargs):
         order_by = kwargs.pop("order_by", None)
         qs = Customer.objects.all()
-        return _apply_ordering(qs, order_by or [], {"name", "email", "created_at"})
+        return _apply_ordering(
+            qs, order_by or [], {"name", "email", "created_at", "order_count", "lifetime_value", "last_order_date"}
+        )
 
     def resolve_all_products(self, info, **kwargs):
         order_by = kwargs.pop("order_by", None)
@@ -225,7 +423,7 @@ class Query(graphene.ObjectType):
 
     def resolve_all_orders(self, info, **kwargs):
         order_by = kwargs.pop("order_by", None)
-        qs = Order.objects.all().distinct()
+        qs = Order.objects.all()
         return _apply_ordering(qs, order_by or [], {"order_date", "total_amount", "created_at"})
 
 
@@ -246,12 +444,109 @@ class UpdateLowStockProducts(graphene.Mutation):
         low_stock = list(Product.objects.filter(stock__lt=10))
         if not low_stock:
             return UpdateLowStockProducts(updated_products=[], message="No low-stock products", ok=True)
+        previous_stock = {product.pk: product.stock for product in low_stock}
         for product in low_stock:
             product.stock = product.stock + increment
-        Product.objects.bulk_update(low_stock, ["stock"]) 
+        with transaction.atomic():
+            Product.objects.bulk_update(low_stock, ["stock"])
+            if increment:
+                transaction.on_commit(lambda: publish_stock_changes(low_stock, previous_stock))
         return UpdateLowStockProducts(updated_products=low_stock, message=f"Updated {len(low_stock)} products", ok=True)
 
 
+def order_created_event(order: Order, customer: Customer, products: list[Product]) -> dict:
+    return {
+        "id": order.pk,
+        "customer_id": customer.pk,
+        "customer_email": customer.email,
+        "total_amount": str(order.total_amount),
+        "order_date": order.order_date.isoformat(),
+        "product_ids": [product.pk for product in products],
+    }
+
+
+def stock_changed_event(product: Product, previous_stock: int) -> dict:
+    return {"id": product.pk, "name": product.name, "stock": product.stock, "previous_stock": previous_stock}
+
+
+def publish_stock_changes(products: list[Product], previous_stock: dict[int, int]) -> None:
+    for product in products:
+        publish(STOCK_CHANGED, stock_changed_event(product, previous_stock[product.pk]))
+
+
+class OrderCreatedEvent(graphene.ObjectType):
+    id = graphene.ID(required=True)
+    customer_id = graphene.ID(required=True)
+    customer_email = graphene.String()
+    total_amount = graphene.Decimal()
+    order_date = graphene.DateTime()
+    product_ids = graphene.List(graphene.NonNull(graphene.ID))
+
+    # Events are plain dicts so they survive the Redis backend unchanged.
+    def resolve_id(event, info):
+        return to_global_id(OrderType._meta.name, event["id"])
+
+    def resolve_customer_id(event, info):
+        return to_global_id(CustomerType._meta.name, event["customer_id"])
+
+    def resolve_order_date(event, info):
+        return datetime.fromisoformat(event["order_date"])
+
+    def resolve_product_ids(event, info):
+        return [to_global_id(ProductType._meta.name, pk) for pk in event["product_ids"]]
+
+
+class StockChangedEvent(graphene.ObjectType):
+    id = graphene.ID(required=True)
+    name = graphene.String()
+    stock = graphene.Int()
+    previous_stock = graphene.Int()
+
+    def resolve_id(event, info):
+        return to_global_id(ProductType._meta.name, event["id"])
+
+
+def _decode_pk(global_or_pk: str) -> str:
+    try:
+        _, pk = from_global_id(global_or_pk)
+    except Exception:
+        pk = None
+    return str(pk or global_or_pk)
+
+
+class Subscription(graphene.ObjectType):
+    order_created = graphene.Field(OrderCreatedEvent, customer_id=graphene.ID())
+    stock_changed = graphene.Field(
+        StockChangedEvent,
+        threshold=graphene.Int(description="Only products whose stock was or is below this value"),
+    )
+
+    async def subscribe_order_created(root, info, customer_id=None):
+        predicate = None
+        if customer_id:
+            wanted = _decode_pk(customer_id)
+            predicate = lambda event: str(event["customer_id"]) == wanted
+        async for event in _listen(ORDER_CREATED, predicate):
+            yield event
+
+    async def subscribe_stock_changed(root, info, threshold=None):
+        predicate = None
+        if threshold is not None:
+            predicate = lambda event: min(event["stock"], event["previous_stock"]) < threshold
+        async for event in _listen(STOCK_CHANGED, predicate):
+            yield event
+
+
+async def _listen(channel: str, predicate):
+    pubsub = get_pubsub()
+    subscription = pubsub.subscribe(channel, predicate)
+    try:
+        async for event in subscription:
+            yield event
+    finally:
+        pubsub.unsubscribe(subscription)
+
+
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     bulk_create_customers = BulkCreateCustomers.Field()
@@ -1,38 +1,8 @@
-# CRM-specific settings
-INSTALLED_APPS = [
-    "django.contrib.admin",
-    "django.contrib.auth",
-    "django.contrib.contenttypes",
-    "django.contrib.sessions",
-    "django.contrib.messages",
-    "django.contrib.staticfiles",
-    "graphene_django",
-    "django_crontab",
-    "django_celery_beat",
-    "django_filters",
-    "crm",
-]
-
-# Cron jobs for django-crontab
-CRONJOBS = [
-    ("*/5 * * * *", "crm.cron.log_crm_heartbeat"),
-    ("0 */12 * * *", "crm.cron.updatelowstock"),
-]
-
-# Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'UTC'
-
-# Celery Beat Schedule
-from celery.schedules import crontab
-
-CELERY_BEAT_SCHEDULE = {
-    'generate-crm-report': {
-        'task': 'crm.tasks.generate_crm_report',
-        'schedule': crontab(day_of_week='mon', hour=6, minute=0),
-    },
-}
+# Kept for anything still pointing DJANGO_SETTINGS_MODULE at crm.settings.
+# The project has a single settings module; the Celery configuration and
+# cron jobs live there, and the beat schedule is set up in crm/celery.py.
+from alx_backend_graphql_crm.settings import *  # noqa: F401,F403
+
+# The old crm.settings also installed django_celery_beat; keep it for anyone
+# still running beat with --scheduler django_celery_beat.schedulers:DatabaseScheduler.
+INSTALLED_APPS = [*INSTALLED_APPS, "django_celery_beat"]  # noqa: F405
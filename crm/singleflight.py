@@ -0,0 +1,194 @@
+"""Single-flight coalescing of identical in-flight GraphQL queries.
+
+Requests carrying the same document, variables, operation name and auth
+scope while one of them is executing wait for that execution (the leader)
+and share its result instead of running again. Only ``query`` operations
+are coalesced; mutations and subscriptions always execute.
+
+``SingleFlight`` is for threads (the WSGI view), ``AsyncSingleFlight`` for a
+single event loop (the WebSocket handler). Coalescing is per process.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from graphql import OperationType, get_operation_ast, parse
+from graphql.error import GraphQLError
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def is_read_only(query: str, operation_name: str | None = None) -> bool:
+    try:
+        operation = get_operation_ast(parse(query), operation_name)
+    except GraphQLError:
+        return False
+    return operation is not None and operation.operation == OperationType.QUERY
+
+
+def operation_key(query: str, variables: dict | None, operation_name: str | None, scope: str) -> str:
+    payload = json.dumps([query, variables or {}, operation_name, scope], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def request_scope(request) -> str:
+    """Auth scope of a Django request: the user plus any bearer credentials."""
+    user = getattr(request, "user", None)
+    principal = f"user:{user.pk}" if user is not None and user.is_authenticated else "anonymous"
+    authorization = request.headers.get("Authorization", "")
+    return f"{principal}:{hashlib.sha256(authorization.encode('utf-8')).hexdigest()}"
+
+
+@dataclass
+class Stats:
+    executions: int = 0
+    coalesced: int = 0
+    timeouts: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "timeouts": self.timeouts}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, timeout: float | None = None, stats: Stats | None = None):
+        self.timeout = timeout
+        self.stats = stats or Stats()
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                # The leader is stuck; don't let it take everyone down with it.
+                self.stats.add("timeouts")
+                self.stats.add("executions")
+                return fn()
+            self.stats.add("coalesced")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.stats.add("executions")
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Coalesces coroutines on one event loop; ``fn`` returns an awaitable."""
+
+    def __init__(self, timeout: float | None = None, stats: Stats | None = None):
+        self.timeout = timeout
+        self.stats = stats or Stats()
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn):
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                # shield: a cancelled follower must not cancel the leader.
+                result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                self.stats.add("timeouts")
+                self.stats.add("executions")
+                return await fn()
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled, not us: run it ourselves.
+                self.stats.add("executions")
+                return await fn()
+            self.stats.add("coalesced")
+            return result
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.stats.add("executions")
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure isn't logged as lost.
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+stats = Stats()
+_flight: SingleFlight | None = None
+_async_flights: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_init_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _setting("CRM_SINGLEFLIGHT_ENABLED", True)
+
+
+def get_singleflight() -> SingleFlight:
+    global _flight
+    with _init_lock:
+        if _flight is None:
+            _flight = SingleFlight(_setting("CRM_SINGLEFLIGHT_TIMEOUT", 30.0), stats)
+        return _flight
+
+
+def get_async_singleflight() -> AsyncSingleFlight:
+    """One instance per event loop, sharing the process-wide ``stats``."""
+    loop = asyncio.get_running_loop()
+    with _init_lock:
+        flight = _async_flights.get(loop)
+        if flight is None:
+            flight = _async_flights[loop] = AsyncSingleFlight(_setting("CRM_SINGLEFLIGHT_TIMEOUT", 30.0), stats)
+        return flight
+
+
+def get_stats() -> dict:
+    in_flight = get_singleflight().in_flight() + sum(f.in_flight() for f in list(_async_flights.values()))
+    return {**stats.snapshot(), "in_flight": in_flight}
@@ -1,108 +1,101 @@
-import requests
-from datetime import datetime
 from pathlib import Path
-from celery import shared_task
+from celery import chord, group, shared_task
+from django.db import DatabaseError
 
-# GraphQL endpoint
-GRAPHQL_URL = "http://localhost:8000/graphql"
+from .celery import app as celery_app  # noqa: F401  (configures shared_task)
+from .joblog import get_job_logger, job_run
 
 # Report log file
 REPORT_LOG = Path("/tmp/crm_report_log.txt")
 
+
 @shared_task
 def generate_crm_report():
     """
     Generate a weekly CRM report with total customers, orders, and revenue.
+
+    Only rows created since the previous ReportSnapshot are scanned; the
+    result is stored as a new snapshot (see crm.reports).
     """
-    try:
-        # GraphQL query to fetch CRM statistics
-        query = """
-        query {
-            allCustomers {
-                totalCount
-            }
-            allOrders {
-                totalCount
-                edges {
-                    node {
-                        totalAmount
-                    }
-                }
-            }
-        }
-        """
-        
-        # Make GraphQL request
-        response = requests.post(
-            GRAPHQL_URL,
-            json={"query": query},
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Extract data from GraphQL response
-            customers_data = data.get("data", {}).get("allCustomers", {})
-            orders_data = data.get("data", {}).get("allOrders", {})
-            
-            total_customers = customers_data.get("totalCount", 0)
-            total_orders = orders_data.get("totalCount", 0)
-            
-            # Calculate total revenue
-            total_revenue = 0
-            orders_edges = orders_data.get("edges", [])
-            for edge in orders_edges:
-                order = edge.get("node", {})
-                total_amount = order.get("totalAmount", 0)
-                if total_amount:
-                    total_revenue += float(total_amount)
-            
-            # Format timestamp
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Create report message
-            report_message = f"{timestamp} - Report: {total_customers} customers, {total_orders} orders, ${total_revenue:.2f} revenue\n"
-            
-            # Log the report
-            try:
-                REPORT_LOG.parent.mkdir(parents=True, exist_ok=True)
-                with REPORT_LOG.open("a", encoding="utf-8") as f:
-                    f.write(report_message)
-            except Exception as e:
-                print(f"Error writing to log file: {e}")
-            
-            return {
-                "status": "success",
-                "customers": total_customers,
-                "orders": total_orders,
-                "revenue": total_revenue
-            }
-            
-        else:
-            error_message = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Error: GraphQL request failed with status {response.status_code}\n"
-            try:
-                REPORT_LOG.parent.mkdir(parents=True, exist_ok=True)
-                with REPORT_LOG.open("a", encoding="utf-8") as f:
-                    f.write(error_message)
-            except Exception:
-                pass
-            
+    from .reports import build_snapshot
+
+    logger = get_job_logger("crm_report", REPORT_LOG)
+    with job_run(logger) as run:
+        try:
+            snapshot = build_snapshot()
+        except Exception as e:
+            run.error("Error generating report", exc_info=True, error=str(e))
             return {
                 "status": "error",
-                "message": f"GraphQL request failed with status {response.status_code}"
+                "message": str(e)
             }
-            
-    except Exception as e:
-        error_message = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Error: {str(e)}\n"
-        try:
-            REPORT_LOG.parent.mkdir(parents=True, exist_ok=True)
-            with REPORT_LOG.open("a", encoding="utf-8") as f:
-                f.write(error_message)
-        except Exception:
-            pass
-        
-        return {
-            "status": "error",
-            "message": str(e)
-        }
+
+        run.rows = snapshot.new_customers + snapshot.new_orders
+        run.info(
+            f"Report (cumulative): {snapshot.total_customers} customers, {snapshot.total_orders} orders, "
+            f"${snapshot.total_revenue:.2f} revenue",
+            snapshot_id=snapshot.pk,
+            customers=snapshot.total_customers,
+            orders=snapshot.total_orders,
+            revenue=str(snapshot.total_revenue),
+            period_orders=snapshot.new_orders,
+            period_revenue=str(snapshot.revenue),
+        )
+
+    return {
+        "status": "success",
+        "snapshot_id": snapshot.pk,
+        "customers": snapshot.total_customers,
+        "orders": snapshot.total_orders,
+        "revenue": float(snapshot.total_revenue),
+        "period_orders": snapshot.new_orders,
+        "period_revenue": float(snapshot.revenue),
+    }
+
+
+@shared_task(bind=True, acks_late=True, autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=5)
+def run_job_chunk(self, job, run_key, lo, hi, params):
+    """Apply one PK range of a chunked job (see crm.jobs); safe to retry."""
+    from .jobs import BUSY_MAX_RETRIES, BUSY_RETRY_DELAY, ChunkBusy, ChunkLost, run_chunk
+
+    try:
+        return run_chunk(job, run_key, lo, hi, params)
+    except (ChunkBusy, ChunkLost) as e:
+        if self.request.is_eager:
+            # Eager retries recurse in-process; the other worker is elsewhere.
+            raise
+        # Another delivery holds the chunk; come back for its result. Enough
+        # retries to outlast crm.jobs.STALE_AFTER, when a dead worker's chunk
+        # can be reclaimed.
+        raise self.retry(exc=e, countdown=BUSY_RETRY_DELAY, max_retries=BUSY_MAX_RETRIES)
+
+
+@shared_task
+def finish_job(results, job, run_key, params):
+    from .jobs import finish
+
+    return finish(job, run_key, results, params)
+
+
+def dispatch_job(job, run_key, params=None, chunk_size=None):
+    """Fan a chunked job out as a chord on the job's queue; returns the chord's result."""
+    from .jobs import get_job, plan_chunks
+
+    definition = get_job(job)
+    ranges, params = plan_chunks(job, run_key, params or {}, chunk_size)
+    callback = finish_job.s(job, run_key, params).set(queue=definition.queue)
+    if not ranges:
+        return callback.apply_async(([],))
+    header = group(run_job_chunk.si(job, run_key, lo, hi, params).set(queue=definition.queue) for lo, hi in ranges)
+    return chord(header)(callback)
+
+
+@shared_task(bind=True)
+def start_job(self, job, run_key=None, params=None, chunk_size=None):
+    """
+    Start a chunked job. Without ``run_key`` the task id is used, so a
+    retried ``start_job`` resumes the same run instead of starting another.
+    """
+    run_key = run_key or self.request.id
+    dispatch_job(job, run_key, params=params, chunk_size=chunk_size)
+    return {"job": job, "run_key": run_key}
@@ -0,0 +1,54 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from crm.filters import OrderFilter
+from crm.models import Customer, Order, Product
+
+
+class OrderFilterProductTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        customer = Customer.objects.create(name="Alice", email="alice@example.com")
+        cls.laptop = Product.objects.create(name="Laptop", price=Decimal("999.99"))
+        cls.laptop_bag = Product.objects.create(name="Laptop Bag", price=Decimal("49.99"))
+        cls.phone = Product.objects.create(name="Phone", price=Decimal("499.99"))
+        cls.both = Order.objects.create(customer=customer)
+        cls.both.products.set([cls.laptop, cls.laptop_bag])
+        cls.other = Order.objects.create(customer=customer)
+        cls.other.products.set([cls.phone])
+
+    def filter(self, **data):
+        with CaptureQueriesContext(connection) as ctx:
+            orders = list(OrderFilter(data, queryset=Order.objects.all()).qs)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        return orders, ctx.captured_queries[0]["sql"]
+
+    def explain(self, **data):
+        sql, params = OrderFilter(data, queryset=Order.objects.all()).qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return " ".join(row[-1] for row in cursor.fetchall())
+
+    def test_product_name_matches_each_order_once_without_distinct(self):
+        orders, sql = self.filter(product_name="laptop")
+        self.assertEqual(orders, [self.both])
+        self.assertNotIn("DISTINCT", sql.upper())
+        self.assertIn("EXISTS", sql.upper())
+
+    def test_product_id_is_a_semi_join_without_distinct(self):
+        orders, sql = self.filter(product_id=self.laptop.pk)
+        self.assertEqual(orders, [self.both])
+        self.assertNotIn("DISTINCT", sql.upper())
+
+    @skipUnless(connection.vendor == "sqlite", "query plan text is SQLite-specific")
+    def test_product_filters_use_through_table_indexes(self):
+        plan = self.explain(product_id=self.laptop.pk)
+        self.assertIn("crm_order_products_product_id", plan)
+        self.assertNotIn("SCAN crm_order_products", plan)
+        plan = self.explain(product_name="laptop")
+        self.assertIn("crm_order_products_order_id_product_id", plan)
+        self.assertNotIn("SCAN crm_order_products", plan)
@@ -0,0 +1,27 @@
+import io
+import os
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from crm.management.commands.bench_startup import FORBIDDEN
+
+# Generous enough for a loaded CI box; tighten locally with the env vars.
+WEB_BUDGET_MS = float(os.environ.get("CRM_STARTUP_BUDGET_MS", "1500"))
+CRON_BUDGET_MS = float(os.environ.get("CRM_CRON_STARTUP_BUDGET_MS", "1500"))
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def bench(self, scenario, **budgets):
+        try:
+            call_command("bench_startup", scenario=[scenario], runs=2, top=0, stdout=io.StringIO(), **budgets)
+        except CommandError as e:
+            self.fail(str(e))
+
+    def test_web_stays_lean_and_within_budget(self):
+        self.assertTrue({"celery", "kombu", "gql", "requests", "numpy"} <= set(FORBIDDEN["web"]))
+        self.bench("web", budget_ms=WEB_BUDGET_MS)
+
+    def test_cron_stays_lean_and_within_budget(self):
+        self.assertTrue({"celery", "kombu", "gql"} <= set(FORBIDDEN["cron"]))
+        self.bench("cron", cron_budget_ms=CRON_BUDGET_MS)
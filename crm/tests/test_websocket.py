@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from django.test import SimpleTestCase
+
+from alx_backend_graphql_crm.asgi import application
+from crm import pubsub
+from crm.pubsub import STOCK_CHANGED, InMemoryPubSub, RedisPubSub
+
+SUBSCRIPTION = "subscription { stockChanged(threshold: 5) { name stock previousStock } }"
+
+
+class Client:
+    """Drives ``application`` over an in-process ASGI websocket."""
+
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        scope = {"type": "websocket", "path": "/graphql", "subprotocols": ["graphql-transport-ws"], "headers": []}
+        self.task = asyncio.ensure_future(application(scope, self.inbox.get, self.outbox.put))
+
+    async def send(self, message: dict) -> None:
+        await self.inbox.put({"type": "websocket.receive", "text": json.dumps(message)})
+
+    async def receive(self) -> dict:
+        return await asyncio.wait_for(self.outbox.get(), 5)
+
+    async def receive_json(self) -> dict:
+        event = await self.receive()
+        return json.loads(event["text"])
+
+    async def disconnect(self) -> None:
+        await self.inbox.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+class FakeRedisPubSub(RedisPubSub):
+    """RedisPubSub whose listeners wait forever instead of reading Redis."""
+
+    async def _listen(self, channel: str) -> None:
+        await asyncio.Event().wait()
+
+
+class GraphQLWebSocketTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = InMemoryPubSub()
+        pubsub.set_pubsub(self.backend)
+        self.addCleanup(pubsub.set_pubsub, None)
+
+    async def test_subscribe_publish_disconnect(self):
+        client = Client()
+        await client.inbox.put({"type": "websocket.connect"})
+        self.assertEqual((await client.receive())["subprotocol"], "graphql-transport-ws")
+        await client.send({"type": "connection_init"})
+        self.assertEqual(await client.receive_json(), {"type": "connection_ack"})
+
+        await client.send({"id": "1", "type": "subscribe", "payload": {"query": SUBSCRIPTION}})
+        while not self.backend.subscriber_count(STOCK_CHANGED):
+            await asyncio.sleep(0)
+        # Filtered out by the threshold: never queued for this client.
+        self.assertEqual(pubsub.publish(STOCK_CHANGED, {"id": 1, "name": "Pen", "stock": 50, "previous_stock": 60}), 0)
+        self.assertEqual(pubsub.publish(STOCK_CHANGED, {"id": 2, "name": "Ink", "stock": 12, "previous_stock": 2}), 1)
+        self.assertEqual(
+            await client.receive_json(),
+            {"id": "1", "type": "next", "payload": {"data": {"stockChanged": {"name": "Ink", "stock": 12, "previousStock": 2}}}},
+        )
+
+        await client.disconnect()
+        self.assertEqual(self.backend.subscriber_count(STOCK_CHANGED), 0)
+
+    async def test_complete_unsubscribes(self):
+        client = Client()
+        await client.inbox.put({"type": "websocket.connect"})
+        await client.receive()
+        await client.send({"type": "connection_init"})
+        await client.receive_json()
+        await client.send({"id": "1", "type": "subscribe", "payload": {"query": SUBSCRIPTION}})
+        while not self.backend.subscriber_count(STOCK_CHANGED):
+            await asyncio.sleep(0)
+        await client.send({"id": "1", "type": "complete"})
+        while self.backend.subscriber_count(STOCK_CHANGED):
+            await asyncio.sleep(0)
+        await client.disconnect()
+
+
+class RedisListenerShutdownTests(SimpleTestCase):
+    def setUp(self):
+        self.backend = FakeRedisPubSub("redis://localhost:6379/15")
+        pubsub.set_pubsub(self.backend)
+        self.addCleanup(pubsub.set_pubsub, None)
+
+    async def test_last_unsubscribe_cancels_listener(self):
+        first = self.backend.subscribe(STOCK_CHANGED)
+        second = self.backend.subscribe(STOCK_CHANGED)
+        (listener,) = self.backend._listeners.values()
+        self.backend.unsubscribe(first)
+        await asyncio.sleep(0)
+        self.assertFalse(listener.done())
+        self.backend.unsubscribe(second)
+        await asyncio.wait([listener], timeout=5)
+        self.assertTrue(listener.cancelled())
+        self.assertEqual(self.backend._listeners, {})
+
+    async def test_lifespan_shutdown_cancels_listeners(self):
+        self.backend.subscribe(STOCK_CHANGED)
+        (listener,) = self.backend._listeners.values()
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        for event in ("lifespan.startup", "lifespan.shutdown"):
+            inbox.put_nowait({"type": event})
+        await asyncio.wait_for(application({"type": "lifespan"}, inbox.get, outbox.put), 5)
+        self.assertEqual(outbox.get_nowait(), {"type": "lifespan.startup.complete"})
+        self.assertEqual(outbox.get_nowait(), {"type": "lifespan.shutdown.complete"})
+        self.assertTrue(listener.cancelled())
+        self.assertEqual(self.backend._listeners, {})
@@ -0,0 +1,63 @@
+import hmac
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from graphene_django.views import GraphQLView
+
+from . import singleflight
+from .export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, astream, export_orders
+
+
+class CoalescingGraphQLView(GraphQLView):
+    """GraphQLView sharing one execution between identical concurrent queries."""
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        execute = super().execute_graphql_request
+        args = (request, data, query, variables, operation_name, show_graphiql)
+        if show_graphiql or not query or not singleflight.enabled():
+            return execute(*args)
+        if not singleflight.is_read_only(query, operation_name):
+            return execute(*args)
+        key = singleflight.operation_key(query, variables, operation_name, singleflight.request_scope(request))
+        return singleflight.get_singleflight().do(key, lambda: execute(*args))
+
+
+@require_GET
+def graphql_stats_view(request):
+    """Single-flight counters: executions run, requests coalesced, leader timeouts."""
+    return JsonResponse({"singleflight": singleflight.get_stats()})
+
+
+def _may_export(request) -> bool:
+    """Staff users, or a bearer token matching ``CRM_EXPORT_TOKEN``."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = getattr(settings, "CRM_EXPORT_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+
+
+@require_GET
+def export_orders_view(request):
+    """Stream orders as NDJSON or CSV; accepts the ``OrderFilter`` arguments."""
+    if not _may_export(request):
+        return JsonResponse({"error": "Staff login or export token required"}, status=403)
+    params = request.GET.copy()
+    fmt = params.pop("format", ["ndjson"])[-1]
+    use_gzip = params.pop("gzip", ["0"])[-1] in ("1", "true")
+    try:
+        chunk_size = int(params.pop("chunk_size", [DEFAULT_CHUNK_SIZE])[-1])
+        stream = export_orders(params, fmt=fmt, chunk_size=chunk_size, gzip=use_gzip)
+    except (ExportError, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    filename = f"orders.{fmt}" + (".gz" if use_gzip else "")
+    content_type = "application/gzip" if use_gzip else EXPORT_FORMATS[fmt]
+    if isinstance(request, ASGIRequest):
+        stream = astream(stream)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
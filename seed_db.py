@@ -6,6 +6,7 @@ from decimal import Decimal
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "alx_backend_graphql_crm.settings")
 django.setup()
 
+from crm.activity import record_order  # noqa: E402
 from crm.models import Customer, Product, Order  # noqa: E402
 from django.utils import timezone  # noqa: E402
 
@@ -25,6 +26,7 @@ def run():
     order.products.add(laptop, mouse)
     order.recalculate_total()
     order.save()
+    record_order(order)
 
     print("Seeded customers:", Customer.objects.count())
     print("Seeded products:", Product.objects.count())